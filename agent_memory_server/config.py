@@ -1,6 +1,12 @@
+import copy
 import os
+import sys
+from collections.abc import Mapping
+from functools import cached_property, lru_cache
+from types import MappingProxyType
 from typing import Any, Literal
 
+import orjson
 import yaml
 from dotenv import load_dotenv
 from pydantic_settings import BaseSettings
@@ -8,10 +14,20 @@ from pydantic_settings import BaseSettings
 from agent_memory_server.logging import get_logger
 
 
-load_dotenv()
-
 logger = get_logger(__name__)
 
+# Prefer the libyaml-backed loader, which parses YAML much faster than the
+# pure-Python one
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
+
+    logger.warning(
+        "PyYAML was built without libyaml; falling back to the slower "
+        "pure-Python YAML loader"
+    )
+
 
 # Model configuration mapping
 MODEL_CONFIGS = {
@@ -50,6 +66,20 @@ MODEL_CONFIGS = {
     "o3-mini": {"provider": "openai", "embedding_dimensions": None},
 }
 
+# Expose the table and each entry as read-only views so callers can't modify
+# shared config. Model names and providers are interned so lookups with
+# interned strings can match on identity before comparing characters.
+MODEL_CONFIGS = MappingProxyType(
+    {
+        sys.intern(name): MappingProxyType(
+            {**config, "provider": sys.intern(config["provider"])}
+        )
+        for name, config in MODEL_CONFIGS.items()
+    }
+)
+
+_EMPTY_MODEL_CONFIG: Mapping[str, Any] = MappingProxyType({})
+
 
 class Settings(BaseSettings):
     redis_url: str = "redis://localhost:6379"
@@ -58,6 +88,10 @@ class Settings(BaseSettings):
     anthropic_api_key: str | None = None
     generation_model: str = "gpt-4o-mini"
     embedding_model: str = "text-embedding-3-small"
+    # Shorten embeddings to this many dimensions, for models that support it
+    # (text-embedding-3-*). Smaller vectors take less bandwidth, storage, and
+    # search time. Changing it requires rebuilding the vector index.
+    embedding_dimensions: int | None = None
     port: int = 8000
     mcp_port: int = 9000
 
@@ -79,6 +113,12 @@ class Settings(BaseSettings):
     # setting is enabled, we also extract discrete memories from message text
     # and save them as separate long-term memory records.
     enable_discrete_memory_extraction: bool = True
+    # Maximum number of concurrent LLM requests made while extracting
+    # discrete memories
+    llm_concurrency: int = 8
+    # Text shorter than this (ignoring surrounding whitespace) is not sent
+    # to the NER, topic, or discrete memory extraction models
+    min_extraction_chars: int = 8
 
     # Topic modeling
     topic_model_source: Literal["BERTopic", "LLM"] = "LLM"
@@ -92,6 +132,8 @@ class Settings(BaseSettings):
     # Used for extracting entities from text
     ner_model: str = "dbmdz/bert-large-cased-finetuned-conll03-english"
     enable_ner: bool = True
+    # Quantize the NER model to int8 when running on CPU
+    ner_quantize: bool = True
 
     # RedisVL Settings
     # TODO: Adapt to vector store settings
@@ -100,6 +142,15 @@ class Settings(BaseSettings):
     redisvl_index_prefix: str = "memory_idx"
     redisvl_indexing_algorithm: str = "HNSW"
 
+    # Cache for chat completions. Responses are reused for identical requests,
+    # and for requests whose semantic key (the variable text a call site opts
+    # in with, e.g. the text topics are extracted from) embeds within the
+    # cosine distance threshold, for the same prompt template, model,
+    # response format, and functions.
+    enable_semantic_chat_cache: bool = False
+    semantic_chat_cache_distance_threshold: float = 0.05
+    semantic_chat_cache_ttl: int = 3600
+
     # Docket settings
     docket_name: str = "memory-server"
     use_docket: bool = True
@@ -126,25 +177,81 @@ class Settings(BaseSettings):
         env_file_encoding = "utf-8"
         extra = "ignore"  # Ignore extra environment variables
 
-    @property
-    def generation_model_config(self) -> dict[str, Any]:
+    def __setattr__(self, name: str, value: Any) -> None:
+        super().__setattr__(name, value)
+        # Drop the memoized model config when the model it describes changes
+        if name in ("generation_model", "embedding_model"):
+            self.__dict__.pop(f"{name}_config", None)
+
+    @cached_property
+    def generation_model_config(self) -> Mapping[str, Any]:
         """Get configuration for the generation model."""
-        return MODEL_CONFIGS.get(self.generation_model, {})
+        return MODEL_CONFIGS.get(self.generation_model, _EMPTY_MODEL_CONFIG)
 
-    @property
-    def embedding_model_config(self) -> dict[str, Any]:
+    @cached_property
+    def embedding_model_config(self) -> Mapping[str, Any]:
         """Get configuration for the embedding model."""
-        return MODEL_CONFIGS.get(self.embedding_model, {})
+        return MODEL_CONFIGS.get(self.embedding_model, _EMPTY_MODEL_CONFIG)
 
     def load_yaml_config(self, config_path: str) -> dict[str, Any]:
         """Load configuration from YAML file."""
-        if not os.path.exists(config_path):
+        try:
+            st = os.stat(config_path)
+        except FileNotFoundError:
             return {}
-        with open(config_path) as f:
-            return yaml.safe_load(f) or {}
+        return copy.deepcopy(
+            _load_config_file(config_path, st.st_ino, st.st_mtime_ns, yaml_format=True)
+        )
+
 
+@lru_cache(maxsize=8)
+def _load_config_file(
+    path: str, ino: int, mtime_ns: int, yaml_format: bool
+) -> dict[str, Any]:
+    """
+    Parse a config file.
 
-settings = Settings()
+    Results are cached by inode and modification time, so a file is only
+    read and parsed again once it has changed. The cached dict is shared,
+    so callers must copy it before modifying it.
+
+    Args:
+        path: Path to the config file
+        ino: Inode number of the file
+        mtime_ns: Modification time of the file in nanoseconds
+        yaml_format: Parse the file as YAML rather than JSON
+
+    Returns:
+        The parsed configuration
+    """
+    if yaml_format:
+        with open(path) as f:
+            return yaml.load(f, Loader=SafeLoader) or {}
+    with open(path, "rb") as f:
+        return orjson.loads(f.read()) or {}
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """
+    Get the application settings.
+
+    Settings are loaded from the environment (and any .env file) on first
+    use rather than at import time, then reused for the life of the process.
+
+    Returns:
+        The Settings instance
+    """
+    load_dotenv()
+    return Settings()
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `from agent_memory_server.config import settings` working while
+    # deferring construction until the attribute is first accessed.
+    if name == "settings":
+        return get_settings()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 def get_config():
@@ -155,14 +262,16 @@ def get_config():
     config_file = os.getenv("REDIS_MEMORY_CONFIG")
     if config_file:
         try:
-            with open(config_file) as f:
-                if config_file.endswith((".yaml", ".yml")):
-                    config_data = yaml.safe_load(f) or {}
-                else:
-                    # Assume JSON
-                    import json
-
-                    config_data = json.load(f) or {}
+            st = os.stat(config_file)
+            config_data = copy.deepcopy(
+                _load_config_file(
+                    config_file,
+                    st.st_ino,
+                    st.st_mtime_ns,
+                    # Assume JSON unless the file has a YAML extension
+                    yaml_format=config_file.endswith((".yaml", ".yml")),
+                )
+            )
         except FileNotFoundError:
             logger.warning("Config file not found", config_file=config_file)
         except Exception as e:  # noqa: BLE001
@@ -173,9 +282,42 @@ def get_config():
             )
 
     # Environment variables override file config
-    for key, value in os.environ.items():
-        if key.startswith("REDIS_MEMORY_"):
-            config_key = key[13:].lower()  # Remove REDIS_MEMORY_ prefix
-            config_data[config_key] = value
+    config_data.update(_redis_memory_env())
 
     return config_data
+
+
+# Environment size and the REDIS_MEMORY_* variables found when last scanned
+_env_cache: tuple[int, dict[str, str]] | None = None
+
+
+def _redis_memory_env() -> dict[str, str]:
+    """
+    Get config overrides from REDIS_MEMORY_* environment variables.
+
+    Scanning the whole environment is only repeated when its size changes or
+    one of the previously found variables has been changed or removed.
+
+    Returns:
+        Config keys (lowercased, without the prefix) mapped to their values
+    """
+    global _env_cache
+    env_size = len(os.environ)
+    if (
+        _env_cache is None
+        or _env_cache[0] != env_size
+        or any(os.environ.get(key) != value for key, value in _env_cache[1].items())
+    ):
+        found = {
+            key: value
+            for key, value in os.environ.items()
+            if key.startswith("REDIS_MEMORY_")
+        }
+        _env_cache = (env_size, found)
+
+    return {
+        key[13:].lower(): value
+        for key, value in _env_cache[1].items()
+        # REDIS_MEMORY_CONFIG names the config file rather than a setting
+        if key != "REDIS_MEMORY_CONFIG"
+    }
@@ -1,14 +1,16 @@
-import json
+import asyncio
 import os
-import hashlib
+import threading
+from collections import Counter
+from collections.abc import Awaitable, Callable
+from functools import lru_cache
 from typing import TYPE_CHECKING, Any
 
-import ulid
+import orjson
 from tenacity.asyncio import AsyncRetrying
 from tenacity.stop import stop_after_attempt
-from transformers import AutoModelForTokenClassification, AutoTokenizer, pipeline
 
-from agent_memory_server.config import settings
+from agent_memory_server.config import get_settings
 from agent_memory_server.filters import DiscreteMemoryExtracted, MemoryType
 from agent_memory_server.llms import (
     AnthropicClientWrapper,
@@ -18,30 +20,41 @@ from agent_memory_server.llms import (
 )
 from agent_memory_server.logging import get_logger
 from agent_memory_server.models import MemoryRecord
+from agent_memory_server.utils.batching import MicroBatcher
+from agent_memory_server.utils.caching import LRUCache
 
 
 if TYPE_CHECKING:
+    import tiktoken
     from bertopic import BERTopic
 
+    from agent_memory_server.vectorstore_adapter import VectorStoreAdapter
+
 
 logger = get_logger(__name__)
 
 # Set tokenizer parallelism environment variable
 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
+# Number of texts the NER pipeline runs through the model per forward pass
+NER_BATCH_SIZE = 16
+# Seconds to wait for more texts before running a partial NER batch
+NER_BATCH_LATENCY = 0.01
+
 # Global model instances
 _topic_model: "BERTopic | None" = None
 _ner_model: Any | None = None
 _ner_tokenizer: Any | None = None
-_entity_cache: dict[str, list[str]] = {}
+_ner_pipeline: Any | None = None
+_ner_pipeline_lock = threading.Lock()
 
+# Maximum number of distinct inputs whose extraction results are kept in memory
+EXTRACTION_CACHE_SIZE = 10_000
 
-def _entity_cache_key(text: str) -> str:
-    """Return a stable cache key for the given text."""
-    return hashlib.md5(text.encode()).hexdigest()
-
-# Cache for BERTopic topic extraction results
-_bertopic_cache: dict[tuple[str, int], list[str]] = {}
+# Maximum number of texts BERTopic transforms together, and how long (in
+# seconds) to wait for more texts before transforming a partial batch
+BERTOPIC_BATCH_SIZE = 32
+BERTOPIC_BATCH_LATENCY = 0.01
 
 
 def get_topic_model() -> "BERTopic":
@@ -56,30 +69,88 @@ def get_topic_model() -> "BERTopic":
     global _topic_model
     if _topic_model is None:
         _topic_model = BERTopic.load(
-            settings.topic_model_path, embedding_model="all-MiniLM-L6-v2"
+            get_settings().topic_model_path, embedding_model="all-MiniLM-L6-v2"
         )
     return _topic_model  # type: ignore
 
 
 def get_ner_model() -> Any:
     """
-    Get or initialize the NER model and tokenizer.
+    Get or initialize the NER pipeline.
+
+    The pipeline is built once and reused. It aggregates sub-word tokens into
+    complete entity spans and runs batched inference when given a list of texts.
+    The model runs in half precision on GPU, and on CPU its linear layers are
+    dynamically quantized to int8 unless settings.ner_quantize is disabled.
+    Construction is guarded by a lock so concurrent workers don't build it twice.
 
     Returns:
         The NER pipeline instance
     """
-    global _ner_model, _ner_tokenizer
-    if _ner_model is None:
-        _ner_tokenizer = AutoTokenizer.from_pretrained(settings.ner_model)
-        _ner_model = AutoModelForTokenClassification.from_pretrained(settings.ner_model)
-    return pipeline("ner", model=_ner_model, tokenizer=_ner_tokenizer)
+    global _ner_model, _ner_tokenizer, _ner_pipeline
+    if _ner_pipeline is not None:
+        return _ner_pipeline
+
+    with _ner_pipeline_lock:
+        if _ner_pipeline is None:
+            import torch
+            from transformers import (
+                AutoModelForTokenClassification,
+                AutoTokenizer,
+                pipeline,
+            )
+
+            settings = get_settings()
+            use_cuda = torch.cuda.is_available()
+            _ner_tokenizer = AutoTokenizer.from_pretrained(settings.ner_model)
+            if use_cuda:
+                # Half precision halves memory traffic and uses tensor cores
+                _ner_model = AutoModelForTokenClassification.from_pretrained(
+                    settings.ner_model, torch_dtype=torch.float16
+                )
+            else:
+                _ner_model = AutoModelForTokenClassification.from_pretrained(
+                    settings.ner_model
+                )
+                if settings.ner_quantize:
+                    # int8 weights for the linear layers, which dominate BERT
+                    # inference time on CPU
+                    _ner_model = torch.ao.quantization.quantize_dynamic(
+                        _ner_model, {torch.nn.Linear}, dtype=torch.qint8
+                    )
+            _ner_pipeline = pipeline(
+                "ner",
+                model=_ner_model,
+                tokenizer=_ner_tokenizer,
+                aggregation_strategy="simple",
+                batch_size=NER_BATCH_SIZE,
+                device=0 if use_cuda else -1,
+            )
+    return _ner_pipeline
+
+
+def _is_trivial_text(text: str) -> bool:
+    """Return whether text is too short for extraction to find anything."""
+    return len(text.strip()) < get_settings().min_extraction_chars
+
+
+def _entities_from_ner_results(results: list[dict[str, Any]]) -> tuple[str, ...]:
+    """Return the unique entity names from aggregated NER pipeline output."""
+    # dict.fromkeys drops duplicates while keeping the order entities appear in
+    return tuple(dict.fromkeys(result["word"] for result in results))
+
+
+# Entities found in each text, shared by the single-text and batched paths.
+# Batches store results from worker threads, so the cache is locked.
+entity_cache: LRUCache[str, tuple[str, ...]] = LRUCache(EXTRACTION_CACHE_SIZE)
 
 
 def extract_entities(text: str) -> list[str]:
     """
     Extract named entities from text using the NER model.
 
-    Results are cached in memory using a key derived from the input text.
+    Results are cached in ``entity_cache``, a bounded in-memory LRU cache
+    keyed on the input text. Call ``entity_cache.cache_clear()`` to reset it.
 
     Args:
         text: The text to extract entities from
@@ -87,39 +158,93 @@ def extract_entities(text: str) -> list[str]:
     Returns:
         List of unique entity names
     """
-    cache_key = _entity_cache_key(text)
-    if cached := _entity_cache.get(cache_key):
-        return cached
+    if _is_trivial_text(text):
+        return []
+    entities = entity_cache.get(text)
+    if entities is None:
+        try:
+            ner = get_ner_model()
+            entities = _entities_from_ner_results(ner(text))
+        except Exception as e:
+            logger.error(f"Error extracting entities: {e}")
+            return []
+        entity_cache.set(text, entities)
+    return list(entities)
+
+
+def extract_entities_batch(texts: list[str]) -> list[list[str]]:
+    """
+    Extract named entities from several texts with a single NER pipeline call.
 
-    try:
-        ner = get_ner_model()
-        results = ner(text)
+    Texts already in ``entity_cache`` aren't run again, repeated
+    texts are only run once, and the rest are processed together so
+    tokenization and the forward pass are batched. New results are cached.
 
-        # Group tokens by entity
-        current_entity = []
-        entities = []
+    Args:
+        texts: The texts to extract entities from
 
-        for result in results:
-            if result["word"].startswith("##"):
-                # This is a continuation of the previous entity
-                current_entity.append(result["word"][2:])
-            else:
-                # This is a new entity
-                if current_entity:
-                    entities.append("".join(current_entity))
-                current_entity = [result["word"]]
+    Returns:
+        A list of unique entity names for each input text, in input order
+    """
+    entities_by_text: dict[str, tuple[str, ...]] = {}
+    texts_to_run = []
+    for text in dict.fromkeys(texts):
+        if _is_trivial_text(text):
+            continue
+        entities = entity_cache.get(text)
+        if entities is None:
+            texts_to_run.append(text)
+        else:
+            entities_by_text[text] = entities
 
-        # Add the last entity if exists
-        if current_entity:
-            entities.append("".join(current_entity))
+    if texts_to_run:
+        try:
+            ner = get_ner_model()
+            batch_results = ner(texts_to_run, batch_size=NER_BATCH_SIZE)
+        except Exception as e:
+            logger.error(f"Error extracting entities: {e}")
+            batch_results = None
+        if batch_results is not None:
+            for text, results in zip(texts_to_run, batch_results, strict=True):
+                entities = _entities_from_ner_results(results)
+                entity_cache.set(text, entities)
+                entities_by_text[text] = entities
 
-        deduped = list(set(entities))
-        _entity_cache[cache_key] = deduped
-        return deduped
+    return [list(entities_by_text.get(text, ())) for text in texts]
 
-    except Exception as e:
-        logger.error(f"Error extracting entities: {e}")
+
+async def extract_entities_batched(text: str) -> list[str]:
+    """
+    Extract named entities from text, batched with other concurrent calls.
+
+    Texts submitted by concurrent callers within NER_BATCH_LATENCY seconds
+    are run through the NER pipeline together in a worker thread, so the
+    event loop isn't blocked and the model runs one forward pass per batch.
+    Results share ``entity_cache`` with ``extract_entities``.
+
+    Args:
+        text: The text to extract entities from
+
+    Returns:
+        List of unique entity names
+    """
+    if _is_trivial_text(text):
         return []
+    entities = entity_cache.get(text)
+    if entities is not None:
+        return list(entities)
+    return await _ner_batcher.submit(text)
+
+
+async def _extract_entities_batch_in_thread(texts: list[str]) -> list[list[str]]:
+    return await asyncio.to_thread(extract_entities_batch, texts)
+
+
+_ner_batcher: MicroBatcher[str, list[str]] = MicroBatcher(
+    _extract_entities_batch_in_thread,
+    max_batch_size=NER_BATCH_SIZE,
+    max_latency=NER_BATCH_LATENCY,
+)
 
 
 async def extract_topics_llm(
@@ -130,6 +255,9 @@ async def extract_topics_llm(
     """
     Extract topics from text using the LLM model.
     """
+    if _is_trivial_text(text):
+        return []
+    settings = get_settings()
     if client:
         _client = client
     else:
@@ -154,10 +282,12 @@ async def extract_topics_llm(
                 model=settings.generation_model,
                 prompt=prompt,
                 response_format={"type": "json_object"},
+                # Similar texts have the same topics, so reuse cached answers
+                semantic_key=text,
             )
             try:
-                topics = json.loads(response.choices[0].message.content)["topics"]
-            except (json.JSONDecodeError, KeyError):
+                topics = orjson.loads(response.choices[0].message.content)["topics"]
+            except (orjson.JSONDecodeError, KeyError):
                 logger.error(
                     f"Error decoding JSON: {response.choices[0].message.content}"
                 )
@@ -172,6 +302,10 @@ def extract_topics_bertopic(text: str, num_topics: int | None = None) -> list[st
     """
     Extract topics from text using the BERTopic model.
 
+    Results are cached in ``topic_cache``, a bounded in-memory LRU cache keyed
+    on the text, so requests for different numbers of topics share an entry.
+    Call ``topic_cache.cache_clear()`` to reset it.
+
     Args:
         text: The text to extract topics from
         num_topics: Number of topics to return. Defaults to settings.top_k_topics
@@ -179,26 +313,76 @@ def extract_topics_bertopic(text: str, num_topics: int | None = None) -> list[st
     Returns:
         List of topic labels
     """
-    _num_topics = num_topics if num_topics is not None else settings.top_k_topics
-    cache_key = (text, _num_topics)
-    if cache_key in _bertopic_cache:
-        return _bertopic_cache[cache_key]
+    if _is_trivial_text(text):
+        return []
+    _num_topics = num_topics if num_topics is not None else get_settings().top_k_topics
+    topics = topic_cache.get(text)
+    if topics is None:
+        topics = _bertopic_topics_for_texts([text])[0]
+        topic_cache.set(text, topics)
+    return list(topics[:_num_topics])
+
+
+async def extract_topics_bertopic_batched(
+    text: str, num_topics: int | None = None
+) -> list[str]:
+    """
+    Extract topics from text using the BERTopic model, batched with other calls.
 
+    Texts submitted by concurrent callers within BERTOPIC_BATCH_LATENCY
+    seconds are transformed together in a worker thread, so the sentence
+    embedding model runs one forward pass per batch instead of one per text.
+    Results share ``topic_cache`` with ``extract_topics_bertopic``.
+
+    Args:
+        text: The text to extract topics from
+        num_topics: Number of topics to return. Defaults to settings.top_k_topics
+
+    Returns:
+        List of topic labels
+    """
+    if _is_trivial_text(text):
+        return []
+    _num_topics = num_topics if num_topics is not None else get_settings().top_k_topics
+    topics = topic_cache.get(text)
+    if topics is None:
+        topics = await _bertopic_batcher.submit(text)
+        topic_cache.set(text, topics)
+    return list(topics[:_num_topics])
+
+
+def _bertopic_topics_for_texts(texts: list[str]) -> list[tuple[str, ...]]:
+    """Run one BERTopic transform over texts and return each text's topic labels."""
     model = get_topic_model()
-    topic_indices, _ = model.transform([text])
-    topics: list[str] = []
+    topic_indices, _ = model.transform(texts)
+    results: list[tuple[str, ...]] = []
 
-    for i, topic_idx in enumerate(topic_indices):
-        if _num_topics and i >= _num_topics:
-            break
+    for topic_idx in topic_indices:
         topic_idx_int = int(topic_idx)
+        topic_info: list[tuple[str, float]] | None = None
         if topic_idx_int != -1:  # Skip outlier topic (-1)
-            topic_info: list[tuple[str, float]] = model.get_topic(topic_idx_int)  # type: ignore
-            if topic_info:
-                topics.extend([info[0] for info in topic_info])
+            topic_info = model.get_topic(topic_idx_int)  # type: ignore
+        results.append(tuple(info[0] for info in topic_info or []))
+
+    return results
 
-    _bertopic_cache[cache_key] = topics
-    return topics
+
+async def _transform_bertopic_batch(texts: list[str]) -> list[tuple[str, ...]]:
+    # Identical texts in a batch only need to be transformed once
+    unique_texts = list(dict.fromkeys(texts))
+    results = await asyncio.to_thread(_bertopic_topics_for_texts, unique_texts)
+    topics_by_text = dict(zip(unique_texts, results, strict=True))
+    return [topics_by_text[text] for text in texts]
+
+
+_bertopic_batcher: MicroBatcher[str, tuple[str, ...]] = MicroBatcher(
+    _transform_bertopic_batch,
+    max_batch_size=BERTOPIC_BATCH_SIZE,
+    max_latency=BERTOPIC_BATCH_LATENCY,
+)
+
+# Topic labels found by BERTopic for each text, before limiting their number
+topic_cache: LRUCache[str, tuple[str, ...]] = LRUCache(EXTRACTION_CACHE_SIZE)
 
 
 async def handle_extraction(text: str) -> tuple[list[str], list[str]]:
@@ -211,24 +395,26 @@ async def handle_extraction(text: str) -> tuple[list[str], list[str]]:
     Returns:
         Tuple of extracted topics and entities
     """
+    settings = get_settings()
+
     # Extract topics if enabled
     topics = []
     if settings.enable_topic_extraction:
         if settings.topic_model_source == "BERTopic":
-            topics = extract_topics_bertopic(text)
+            topics = await extract_topics_bertopic_batched(text)
         else:
             topics = await extract_topics_llm(text)
 
     # Extract entities if enabled
     entities = []
     if settings.enable_ner:
-        entities = extract_entities(text)
+        entities = await extract_entities_batched(text)
 
     # Merge with existing topics and entities
     if topics:
-        topics = list(set(topics))
+        topics = list(dict.fromkeys(topics))
     if entities:
-        entities = list(set(entities))
+        entities = list(dict.fromkeys(entities))
 
     return topics, entities
 
@@ -280,71 +466,130 @@ DISCRETE_EXTRACTION_PROMPT = """
     Extracted memories:
     """
 
+# Stand-in for the message text used to split the rendered prompt
+_MESSAGE_PLACEHOLDER = "\x00message\x00"
 
-async def extract_discrete_memories(
-    memories: list[MemoryRecord] | None = None,
-    deduplicate: bool = True,
-):
+
+@lru_cache(maxsize=4)
+def _discrete_extraction_prompt_parts(top_k_topics: int) -> tuple[str, str]:
     """
-    Extract episodic and semantic memories from text using an LLM.
+    Render DISCRETE_EXTRACTION_PROMPT once and split it around the message.
+
+    Args:
+        top_k_topics: Number of topics the prompt asks for
+
+    Returns:
+        The prompt text before and after the message
     """
-    provider = get_model_config(settings.generation_model).provider
-    client = await get_model_client(provider)
+    prompt = DISCRETE_EXTRACTION_PROMPT.format(
+        message=_MESSAGE_PLACEHOLDER, top_k_topics=top_k_topics
+    )
+    prefix, suffix = prompt.split(_MESSAGE_PLACEHOLDER)
+    return prefix, suffix
 
-    # Use vectorstore adapter to find messages that need discrete memory extraction
-    # TODO: Sort out circular imports
-    from agent_memory_server.long_term_memory import index_long_term_memories
-    from agent_memory_server.vectorstore_factory import get_vectorstore_adapter
 
-    adapter = await get_vectorstore_adapter()
+# Token encodings by model. Only successful loads are kept, so a failed
+# download is tried again on a later run.
+_token_encodings: dict[str, "tiktoken.Encoding"] = {}
 
-    if not memories:
-        # If no memories are provided, search for any messages in long-term memory
-        # that haven't been processed for discrete extraction
 
-        memories = []
-        offset = 0
-        while True:
-            search_result = await adapter.search_memories(
-                query="",  # Empty query to get all messages
-                memory_type=MemoryType(eq="message"),
-                discrete_memory_extracted=DiscreteMemoryExtracted(eq="f"),
-                limit=25,
-                offset=offset,
-            )
+def _get_token_encoding(model: str) -> "tiktoken.Encoding | None":
+    """
+    Get the tiktoken encoding used to estimate prompt sizes for a model.
 
-            logger.info(
-                f"Found {len(search_result.memories)} memories to extract: {[m.id for m in search_result.memories]}"
-            )
+    Models tiktoken doesn't know, such as Anthropic models, use cl100k_base
+    as an approximation. If the encoding can't be loaded (for example, when
+    its BPE file can't be downloaded), None is returned and prompt size
+    checks are skipped; the load is attempted again on the next call.
 
-            memories += search_result.memories
+    The first load may download the BPE file, so call this off the event
+    loop (see extract_discrete_memories).
 
-            if len(search_result.memories) < 25:
-                break
+    Args:
+        model: The model name
 
-            offset += 25
+    Returns:
+        The encoding, or None if it isn't available
+    """
+    encoding = _token_encodings.get(model)
+    if encoding is not None:
+        return encoding
+    try:
+        import tiktoken
 
-    new_discrete_memories = []
-    updated_memories = []
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logger.warning(f"Token encoding unavailable, skipping prompt size checks: {e}")
+        return None
+    _token_encodings[model] = encoding
+    return encoding
 
-    for memory in memories:
-        if not memory or not memory.text:
-            logger.info(f"Deleting memory with no text: {memory}")
-            await adapter.delete_memories([memory.id])
-            continue
 
+@lru_cache(maxsize=8)
+def _discrete_prompt_overhead_tokens(
+    encoding: "tiktoken.Encoding", top_k_topics: int
+) -> int:
+    """Count the tokens in the fixed parts of the discrete extraction prompt."""
+    prefix, suffix = _discrete_extraction_prompt_parts(top_k_topics)
+    return len(encoding.encode(prefix)) + len(encoding.encode(suffix))
+
+
+def _estimate_discrete_prompt_tokens(
+    text: str, encoding: "tiktoken.Encoding", top_k_topics: int
+) -> int:
+    """
+    Estimate the size of the discrete extraction prompt for a message.
+
+    The fixed instructions around the message are tokenized once per
+    encoding, so only the message itself is tokenized on each call.
+
+    Args:
+        text: The message text
+        encoding: The token encoding for the generation model
+        top_k_topics: Number of topics the prompt asks for
+
+    Returns:
+        The estimated prompt size in tokens
+    """
+    return _discrete_prompt_overhead_tokens(encoding, top_k_topics) + len(
+        encoding.encode(text)
+    )
+
+
+async def _extract_from_memory(
+    memory: MemoryRecord,
+    prompt: str,
+    client: OpenAIClientWrapper | AnthropicClientWrapper,
+    model: str,
+    semaphore: asyncio.Semaphore,
+) -> tuple[MemoryRecord, list[dict[str, Any]]]:
+    """
+    Ask the LLM for discrete memories contained in a single memory's text.
+
+    Args:
+        memory: The message memory to extract from
+        prompt: The extraction prompt for this memory
+        client: The LLM client to use
+        model: The generation model to use
+        semaphore: Limits how many LLM requests run at once
+
+    Returns:
+        The memory marked as processed, and the extracted memories
+    """
+    async with semaphore:
         async for attempt in AsyncRetrying(stop=stop_after_attempt(3)):
             with attempt:
                 response = await client.create_chat_completion(
-                    model=settings.generation_model,
-                    prompt=DISCRETE_EXTRACTION_PROMPT.format(
-                        message=memory.text, top_k_topics=settings.top_k_topics
-                    ),
+                    model=model,
+                    prompt=prompt,
                     response_format={"type": "json_object"},
                 )
                 try:
-                    new_message = json.loads(response.choices[0].message.content)
-                except json.JSONDecodeError:
+                    new_message = orjson.loads(response.choices[0].message.content)
+                except orjson.JSONDecodeError:
                     logger.error(
                         f"Error decoding JSON: {response.choices[0].message.content}"
                     )
@@ -357,29 +602,277 @@ async def extract_discrete_memories(
                         f"Invalid response format: {response.choices[0].message.content}"
                     )
                     raise
-                new_discrete_memories.extend(new_message["memories"])
 
-        # Update the memory to mark it as processed using the vectorstore adapter
-        updated_memory = memory.model_copy(update={"discrete_memory_extracted": "t"})
-        updated_memories.append(updated_memory)
+    # Mark the memory as processed
+    updated_memory = memory.model_copy(update={"discrete_memory_extracted": "t"})
+    return updated_memory, new_message["memories"]
 
-    if updated_memories:
-        await adapter.update_memories(updated_memories)
 
-    if new_discrete_memories:
-        long_term_memories = [
-            MemoryRecord(
-                id=str(ulid.ULID()),
-                text=new_memory["text"],
-                memory_type=new_memory.get("type", "episodic"),
-                topics=new_memory.get("topics", []),
-                entities=new_memory.get("entities", []),
-                discrete_memory_extracted="t",
+# Number of memories fetched per search when looking for unprocessed messages
+EXTRACTION_PAGE_SIZE = 25
+# Largest number of pages requested concurrently while paginating
+MAX_CONCURRENT_PAGES = 8
+
+
+async def _find_unextracted_messages(
+    adapter: "VectorStoreAdapter",
+) -> list[MemoryRecord]:
+    """
+    Find message memories that haven't been processed for discrete extraction.
+
+    The adapter can't count matching memories, so pages are fetched in
+    windows that double in size (up to MAX_CONCURRENT_PAGES) with each
+    window's pages requested concurrently. Pagination stops at the first
+    short page.
+
+    Args:
+        adapter: The vectorstore adapter to search
+
+    Returns:
+        The unprocessed message memories, in search order
+    """
+
+    async def fetch_page(page: int) -> list[MemoryRecord]:
+        search_result = await adapter.search_memories(
+            query="",  # Empty query to get all messages
+            memory_type=MemoryType(eq="message"),
+            discrete_memory_extracted=DiscreteMemoryExtracted(eq="f"),
+            limit=EXTRACTION_PAGE_SIZE,
+            offset=page * EXTRACTION_PAGE_SIZE,
+        )
+        logger.info(
+            f"Found {len(search_result.memories)} memories to extract: {[m.id for m in search_result.memories]}"
+        )
+        return search_result.memories
+
+    memories = list(await fetch_page(0))
+    next_page = 1
+    window = 1
+    while len(memories) == next_page * EXTRACTION_PAGE_SIZE:
+        pages = await asyncio.gather(
+            *(fetch_page(page) for page in range(next_page, next_page + window))
+        )
+        for page_memories in pages:
+            memories += page_memories
+            if len(page_memories) < EXTRACTION_PAGE_SIZE:
+                return memories
+        next_page += window
+        window = min(window * 2, MAX_CONCURRENT_PAGES)
+
+    return memories
+
+
+def _new_memory_ids(count: int) -> list[str]:
+    """
+    Generate IDs for a batch of new memories.
+
+    Only the first ULID reads the clock and random source. The rest
+    increment it, so IDs in a batch are unique and sort in generation order.
+
+    Args:
+        count: Number of IDs to generate
+
+    Returns:
+        The new ULID strings, in ascending order
+    """
+    import ulid
+
+    if count == 0:
+        return []
+    first = int(ulid.ULID())
+    return [str(ulid.ULID.from_int(first + i)) for i in range(count)]
+
+
+# Maximum number of extracted memories waiting to be indexed
+INDEX_QUEUE_SIZE = 64
+# Maximum number of extracted memories indexed in a single call
+INDEX_BATCH_SIZE = 32
+# Estimated prompts are only skipped as too long for the model once they exceed
+# its token limit by this factor, since the estimate may use another tokenizer
+OVERSIZED_PROMPT_MARGIN = 1.2
+
+
+async def _index_from_queue(
+    queue: "asyncio.Queue[tuple[str, MemoryRecord] | None]",
+    index_memories: Callable[..., Awaitable[None]],
+    deduplicate: bool,
+    indexed: Counter[str],
+) -> None:
+    """
+    Index memories from the queue in batches until a None sentinel arrives.
+
+    If indexing fails, the queue is still drained so producers never block,
+    and the first error is raised once the sentinel is reached.
+
+    Args:
+        queue: Queue of (source memory id, memory) pairs, terminated by None
+        index_memories: The function used to index a batch of memories
+        deduplicate: Whether to deduplicate memories while indexing
+        indexed: Counts of memories indexed per source memory id, updated
+            as each batch succeeds
+    """
+    error: Exception | None = None
+    done = False
+    while not done:
+        batch = [await queue.get()]
+        while len(batch) < INDEX_BATCH_SIZE and not queue.empty():
+            batch.append(queue.get_nowait())
+
+        # The sentinel is queued after every memory, so it can only come last
+        done = batch[-1] is None
+        entries = [entry for entry in batch if entry is not None]
+        if entries and error is None:
+            try:
+                await index_memories(
+                    [memory for _, memory in entries], deduplicate=deduplicate
+                )
+            except Exception as e:
+                logger.error(f"Error indexing extracted memories: {e}")
+                error = e
+            else:
+                indexed.update(source_id for source_id, _ in entries)
+
+    if error is not None:
+        raise error
+
+
+async def extract_discrete_memories(
+    memories: list[MemoryRecord] | None = None,
+    deduplicate: bool = True,
+):
+    """
+    Extract episodic and semantic memories from text using an LLM.
+    """
+    settings = get_settings()
+    model_config = get_model_config(settings.generation_model)
+    client = await get_model_client(model_config.provider)
+
+    # Use vectorstore adapter to find messages that need discrete memory extraction
+    # TODO: Sort out circular imports
+    from agent_memory_server.long_term_memory import index_long_term_memories
+    from agent_memory_server.vectorstore_factory import get_vectorstore_adapter
+
+    adapter = await get_vectorstore_adapter()
+
+    if not memories:
+        # If no memories are provided, search for any messages in long-term memory
+        # that haven't been processed for discrete extraction
+
+        memories = await _find_unextracted_messages(adapter)
+
+    prompt_prefix, prompt_suffix = _discrete_extraction_prompt_parts(
+        settings.top_k_topics
+    )
+    # Loading the encoding may download its BPE file, so do it in a worker
+    # thread, once per run
+    encoding = await asyncio.to_thread(_get_token_encoding, settings.generation_model)
+    # Token counts are estimates (cl100k_base stands in for tokenizers
+    # tiktoken doesn't know), so only prompts well over the limit are skipped
+    token_limit = int(model_config.max_tokens * OVERSIZED_PROMPT_MARGIN)
+
+    memories_to_extract = []
+    updated_memories = []
+    ids_to_delete = []
+    for memory in memories:
+        if not memory or not memory.text:
+            logger.info(f"Deleting memory with no text: {memory}")
+            ids_to_delete.append(memory.id)
+            continue
+        if _is_trivial_text(memory.text):
+            # Too short to hold anything worth remembering, so skip the LLM
+            updated_memories.append(
+                memory.model_copy(update={"discrete_memory_extracted": "t"})
             )
-            for new_memory in new_discrete_memories
-        ]
+            continue
+        if encoding is not None:
+            prompt_tokens = _estimate_discrete_prompt_tokens(
+                memory.text, encoding, settings.top_k_topics
+            )
+            if prompt_tokens > token_limit:
+                # The request would be rejected, so don't spend a round trip
+                # on it. Mark it processed so it isn't fetched again each run.
+                logger.warning(
+                    f"Skipping discrete memory extraction for memory {memory.id}: "
+                    f"prompt of ~{prompt_tokens} tokens exceeds the "
+                    f"{model_config.max_tokens} token limit of "
+                    f"{settings.generation_model}"
+                )
+                updated_memories.append(
+                    memory.model_copy(update={"discrete_memory_extracted": "t"})
+                )
+                continue
+        memories_to_extract.append(memory)
+
+    # Delete all empty memories in one round trip
+    if ids_to_delete:
+        await adapter.delete_memories(ids_to_delete)
+
+    # LLM calls are I/O bound, so run them concurrently up to the configured limit
+    semaphore = asyncio.Semaphore(settings.llm_concurrency)
+
+    # Extracted memories are indexed in batches while other extractions are
+    # still waiting on the LLM, rather than all at once at the end
+    queue: asyncio.Queue[tuple[str, MemoryRecord] | None] = asyncio.Queue(
+        maxsize=INDEX_QUEUE_SIZE
+    )
+    indexed: Counter[str] = Counter()
+    indexer_task = asyncio.create_task(
+        _index_from_queue(queue, index_long_term_memories, deduplicate, indexed)
+    )
+
+    async def extract_and_enqueue(memory: MemoryRecord) -> tuple[MemoryRecord, int]:
+        updated_memory, extracted_memories = await _extract_from_memory(
+            memory,
+            prompt_prefix + memory.text + prompt_suffix,
+            client,
+            settings.generation_model,
+            semaphore,
+        )
+        memory_ids = _new_memory_ids(len(extracted_memories))
+        for memory_id, new_memory in zip(memory_ids, extracted_memories, strict=True):
+            await queue.put(
+                (
+                    memory.id,
+                    MemoryRecord(
+                        id=memory_id,
+                        text=new_memory["text"],
+                        memory_type=new_memory.get("type", "episodic"),
+                        topics=new_memory.get("topics", []),
+                        entities=new_memory.get("entities", []),
+                        discrete_memory_extracted="t",
+                    ),
+                )
+            )
+        return updated_memory, len(extracted_memories)
 
-        await index_long_term_memories(
-            long_term_memories,
-            deduplicate=deduplicate,
+    try:
+        results = await asyncio.gather(
+            *(extract_and_enqueue(memory) for memory in memories_to_extract),
+            return_exceptions=True,
         )
+    finally:
+        # Let the indexer finish whatever is still queued. Its error is raised
+        # below, once the sources that were indexed have been marked.
+        await queue.put(None)
+        (index_error,) = await asyncio.gather(indexer_task, return_exceptions=True)
+
+    errors = []
+    for result in results:
+        if isinstance(result, BaseException):
+            errors.append(result)
+            continue
+        updated_memory, extracted_count = result
+        # Only mark a source once every memory extracted from it is indexed
+        if indexed[updated_memory.id] == extracted_count:
+            updated_memories.append(updated_memory)
+    if index_error is not None:
+        errors.append(index_error)
+
+    # Mark the sources whose memories were indexed, and trivial ones, as
+    # processed even when other work failed, so a retry doesn't index them
+    # a second time
+    if updated_memories:
+        await adapter.update_memories(updated_memories)
+
+    if errors:
+        raise errors[0]
@@ -1,26 +1,85 @@
+import asyncio
+import base64
+import hashlib
+import importlib.util
 import json
 import logging
 import os
+from collections.abc import AsyncIterator, Awaitable, Callable
+from dataclasses import dataclass
 from enum import Enum
-from typing import Any
+from functools import cache, lru_cache, partial
+from types import SimpleNamespace
+from typing import TYPE_CHECKING, Any, Literal, get_args
 
-import numpy as np
-from pydantic import BaseModel
+import orjson
+from pydantic import TypeAdapter
 
+from agent_memory_server.config import get_settings
+from agent_memory_server.utils.batching import MicroBatcher
 
-try:  # Optional dependency
-    from openai import AsyncOpenAI
-except Exception:  # pragma: no cover - dependency may not be installed
-    AsyncOpenAI = None  # type: ignore[misc]
 
-try:  # Optional dependency
-    import anthropic
-except Exception:  # pragma: no cover - dependency may not be installed
-    anthropic = None  # type: ignore
+if TYPE_CHECKING:
+    import numpy as np
+    from redis.asyncio import Redis
+    from redisvl.index import AsyncSearchIndex
 
 
 logger = logging.getLogger(__name__)
 
+# Optional provider SDKs. They take most of a second to import, so they are
+# imported when a client is first created rather than with this module.
+_LAZY_IMPORTS: dict[str, Callable[[], Any]] = {
+    "AsyncOpenAI": lambda: importlib.import_module("openai").AsyncOpenAI,
+    "anthropic": lambda: importlib.import_module("anthropic"),
+}
+
+
+def _lazy_import(name: str) -> Any:
+    """Get an optional dependency, importing it on first use, or None if missing"""
+    module_globals = globals()
+    if name not in module_globals:
+        try:
+            module_globals[name] = _LAZY_IMPORTS[name]()
+        except Exception:  # dependency may not be installed
+            module_globals[name] = None
+    return module_globals[name]
+
+
+def __getattr__(name: str) -> Any:
+    # Keep `agent_memory_server.llms.AsyncOpenAI` and `.anthropic` available
+    # (and patchable) without importing them with the module.
+    if name in _LAZY_IMPORTS:
+        return _lazy_import(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# Model used by OpenAIClientWrapper.create_embedding unless another is given
+DEFAULT_EMBEDDING_MODEL = "text-embedding-3-small"
+# Embedding models that can return shortened vectors via `dimensions`
+TRUNCATABLE_EMBEDDING_MODELS = frozenset(
+    {"text-embedding-3-small", "text-embedding-3-large"}
+)
+# Element types create_embedding can return
+EmbeddingDType = Literal["float32", "float16", "int8"]
+# Maximum number of inputs OpenAI accepts in one embeddings request
+EMBEDDING_MAX_INPUTS = 2048
+# Maximum estimated tokens in one embeddings request, kept below OpenAI's
+# limit of 300,000 since token counts are only estimated
+EMBEDDING_MAX_BATCH_TOKENS = 250_000
+# Seconds to wait for concurrent embedding requests to join the same API call
+EMBEDDING_BATCH_LATENCY = 0.005
+# Maximum number of embeddings requests in flight at once, to respect rate limits
+EMBEDDING_CONCURRENCY = 8
+# Seconds the shared OpenAI HTTP client waits on a request, the SDK's default
+OPENAI_HTTP_TIMEOUT = 600.0
+# Maximum number of tokens a chat completion may produce
+CHAT_MAX_TOKENS = 1024
+# Predicted completion tokens per word of prompt, used to order batch prompts
+OUTPUT_TOKENS_PER_PROMPT_WORD = 2
+# httpx needs the optional h2 package to speak HTTP/2
+_HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 
 class ModelProvider(str, Enum):
     """Type of model provider"""
@@ -29,7 +88,8 @@ class ModelProvider(str, Enum):
     ANTHROPIC = "anthropic"
 
 
-class ModelConfig(BaseModel):
+@dataclass(frozen=True, slots=True)
+class ModelConfig:
     """Configuration for a model"""
 
     provider: ModelProvider
@@ -37,6 +97,17 @@ class ModelConfig(BaseModel):
     max_tokens: int
     embedding_dimensions: int = 1536  # Default for OpenAI ada-002
 
+    @classmethod
+    def validate(cls, data: Any) -> "ModelConfig":
+        """Validate user-supplied configuration, such as a dict, into a ModelConfig"""
+        return _model_config_adapter().validate_python(data)
+
+
+@cache
+def _model_config_adapter() -> TypeAdapter[ModelConfig]:
+    # Built on first use, since the static table below needs no validation
+    return TypeAdapter(ModelConfig)
+
 
 # Model configurations
 MODEL_CONFIGS = {
@@ -187,49 +258,509 @@ MODEL_CONFIGS = {
 }
 
 
+# Configuration used for models missing from MODEL_CONFIGS
+_DEFAULT_CFG = MODEL_CONFIGS["gpt-4o-mini"]
+
+
+@lru_cache(maxsize=256)
 def get_model_config(model_name: str) -> ModelConfig:
     """Get configuration for a model"""
-    if model_name in MODEL_CONFIGS:
-        return MODEL_CONFIGS[model_name]
+    config = MODEL_CONFIGS.get(model_name)
+    if config is not None:
+        return config
 
     # Default to GPT-4o-mini if model not found
-    logger.warning(f"Model {model_name} not found in configuration, using gpt-4o-mini")
-    return MODEL_CONFIGS["gpt-4o-mini"]
+    logger.warning("Model %s not found in configuration, using gpt-4o-mini", model_name)
+    return _DEFAULT_CFG
+
+
+def truncated_embedding_dimensions(model: str) -> int | None:
+    """
+    Get the shortened vector length to request from an embedding model.
 
+    Returns:
+        The embedding_dimensions setting if it is set and the model supports
+        shortened vectors, otherwise None
+    """
+    dimensions = get_settings().embedding_dimensions
+    if dimensions is not None and model in TRUNCATABLE_EMBEDDING_MODELS:
+        return dimensions
+    return None
 
+
+def get_embedding_dimensions(model: str) -> int:
+    """Get the length of the vectors an embedding model returns"""
+    return (
+        truncated_embedding_dimensions(model)
+        or get_model_config(model).embedding_dimensions
+    )
+
+
+@dataclass(slots=True)
 class ChatResponse:
     """Unified wrapper for chat responses from different providers"""
 
-    def __init__(self, choices: list[Any], usage: dict[str, int]):
-        self.choices = choices or []
-        self.usage = usage or {"total_tokens": 0}
+    choices: list[Any]
+    usage: dict[str, int]
+
+    def __post_init__(self):
+        self.choices = self.choices or []
+        self.usage = self.usage or {"total_tokens": 0}
 
     @property
     def total_tokens(self) -> int:
         return self.usage.get("total_tokens", 0)
 
 
+def _get_usage_field(usage: Any, name: str) -> int:
+    """Read a token count from a usage object or dict, treating missing as 0."""
+    if usage is None:
+        return 0
+    if isinstance(usage, dict):
+        return usage.get(name) or 0
+    return getattr(usage, name, None) or 0
+
+
+def _chat_response_to_json(response: ChatResponse) -> bytes | None:
+    """Serialize a response for the chat cache, or None if it has no text."""
+    contents = []
+    for choice in response.choices:
+        message = (
+            choice.get("message")
+            if isinstance(choice, dict)
+            else getattr(choice, "message", None)
+        )
+        content = (
+            message.get("content")
+            if isinstance(message, dict)
+            else getattr(message, "content", None)
+        )
+        # Function call responses carry no content; don't cache them
+        if content is None:
+            return None
+        contents.append(content)
+    return orjson.dumps({"contents": contents})
+
+
+def _text_choice(content: str) -> SimpleNamespace:
+    """Build an OpenAI-style choice holding a message's text."""
+    return SimpleNamespace(message=SimpleNamespace(content=content))
+
+
+def _chat_response_from_json(data: bytes | str) -> ChatResponse:
+    """
+    Rebuild a cached response with OpenAI-style choices.
+
+    Serving a response from the cache spends no tokens, so total_tokens is 0.
+    """
+    cached = orjson.loads(data)
+    return ChatResponse(
+        choices=[_text_choice(content) for content in cached["contents"]],
+        usage={"total_tokens": 0},
+    )
+
+
+async def collect_stream(stream: AsyncIterator[str]) -> ChatResponse:
+    """
+    Collect a streamed completion into a ChatResponse.
+
+    Streams don't report token usage, so total_tokens is 0.
+    """
+    parts = [text async for text in stream]
+    return ChatResponse(choices=[_text_choice("".join(parts))], usage={})
+
+
+def _options_hash(*options: Any) -> str:
+    """Hash request options into a short tag value."""
+    encoded = orjson.dumps(options, option=orjson.OPT_SORT_KEYS)
+    return hashlib.blake2b(encoded, digest_size=8).hexdigest()
+
+
+class SemanticChatCache:
+    """
+    Cache chat completion responses in Redis.
+
+    Responses are stored under a hash of the prompt and request options, so
+    identical requests are answered from the cache. Callers can opt in to
+    semantic matching by passing a ``semantic_key``, the variable part of the
+    prompt (such as the user's text, without the surrounding template). It is
+    embedded and stored in a RedisVL vector index, and a request whose key is
+    within the cosine distance threshold of a stored key sent with the same
+    prompt template (the prompt around the key), model, response format, and
+    functions reuses that response. Embedding the whole prompt would let its
+    fixed template dominate the distance. Responses are stored as JSON and
+    expire after ``ttl`` seconds; cached responses report no token usage.
+    """
+
+    def __init__(
+        self,
+        redis: "Redis",
+        embed: "Callable[[list[str]], Awaitable[np.ndarray]]",
+        distance_threshold: float = 0.05,
+        ttl: int = 3600,
+        dimensions: int = 1536,
+        name: str = "chat_completion_cache",
+    ):
+        """
+        Args:
+            redis: Redis client to store responses with
+            embed: Async function returning one embedding per prompt
+            distance_threshold: Maximum cosine distance for a semantic match
+            ttl: Seconds before a cached response expires
+            dimensions: Dimensions of the prompt embeddings
+            name: Name of the vector index, also used as the key prefix
+        """
+        self.redis = redis
+        self.embed = embed
+        self.distance_threshold = distance_threshold
+        self.ttl = ttl
+        self.dimensions = dimensions
+        self.name = name
+        self._index: AsyncSearchIndex | None = None
+
+    async def get_or_create(
+        self,
+        create: Callable[..., Awaitable[ChatResponse]],
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+        semantic_key: str | None = None,
+    ) -> ChatResponse:
+        """
+        Return a cached response for the request, or create and cache one.
+
+        Cache errors are logged and never fail the request.
+
+        Args:
+            create: Function creating the completion on a cache miss
+            model: The model name
+            prompt: The prompt text
+            response_format: Optional response format
+            functions: Optional function definitions
+            function_call: Optional function call
+            semantic_key: Variable text of the prompt to match semantically.
+                Without it, only identical requests are reused.
+
+        Returns:
+            The cached or newly created response
+        """
+        tags = {
+            "model": model,
+            "response_format": _options_hash(response_format),
+            "functions": _options_hash(functions, function_call),
+            # Semantic matches are limited to prompts built the same way
+            "template": _options_hash(
+                prompt if semantic_key is None else prompt.replace(semantic_key, "\0")
+            ),
+        }
+        digest = hashlib.blake2b(
+            "\0".join((*tags.values(), prompt)).encode(), digest_size=16
+        ).hexdigest()
+
+        embedding = None
+        try:
+            cached = await self.redis.get(f"{self.name}:exact:{digest}")
+            if cached is not None:
+                return _chat_response_from_json(cached)
+
+            if semantic_key is not None:
+                embedding = (
+                    (await self.embed([semantic_key]))[0].astype("float16").tobytes()
+                )
+                cached = await self._find_similar(embedding, tags)
+                if cached is not None:
+                    return _chat_response_from_json(cached)
+        except Exception as e:
+            logger.warning(f"Error reading from chat completion cache: {e}")
+
+        response = await create(
+            model, prompt, response_format, functions, function_call
+        )
+
+        payload = _chat_response_to_json(response)
+        if payload is not None:
+            try:
+                await self._store(digest, payload, embedding, tags)
+            except Exception as e:
+                logger.warning(f"Error writing to chat completion cache: {e}")
+        return response
+
+    async def _get_index(self) -> "AsyncSearchIndex":
+        if self._index is None:
+            from redisvl.index import AsyncSearchIndex
+
+            index = AsyncSearchIndex.from_dict(
+                {
+                    "index": {
+                        "name": self.name,
+                        "prefix": f"{self.name}:entry",
+                        "storage_type": "hash",
+                    },
+                    "fields": [
+                        {"name": "model", "type": "tag"},
+                        {"name": "response_format", "type": "tag"},
+                        {"name": "functions", "type": "tag"},
+                        {"name": "template", "type": "tag"},
+                        {
+                            "name": "prompt_vector",
+                            "type": "vector",
+                            "attrs": {
+                                "dims": self.dimensions,
+                                "distance_metric": "cosine",
+                                "algorithm": "flat",
+                                # Half precision halves index memory without
+                                # changing which prompts match
+                                "datatype": "float16",
+                            },
+                        },
+                    ],
+                },
+                redis_client=self.redis,
+            )
+            await index.create(overwrite=False)
+            self._index = index
+        return self._index
+
+    async def _find_similar(self, embedding: bytes, tags: dict[str, str]) -> str | None:
+        from redisvl.query import VectorQuery
+        from redisvl.query.filter import Tag
+
+        index = await self._get_index()
+        filter_expression = (
+            (Tag("model") == tags["model"])
+            & (Tag("response_format") == tags["response_format"])
+            & (Tag("functions") == tags["functions"])
+            & (Tag("template") == tags["template"])
+        )
+        results = await index.query(
+            VectorQuery(
+                vector=embedding,
+                vector_field_name="prompt_vector",
+                return_fields=["response"],
+                dtype="float16",
+                filter_expression=filter_expression,
+                num_results=1,
+            )
+        )
+        if results and float(results[0]["vector_distance"]) < self.distance_threshold:
+            return results[0]["response"]
+        return None
+
+    async def _store(
+        self,
+        digest: str,
+        payload: bytes,
+        embedding: bytes | None,
+        tags: dict[str, str],
+    ) -> None:
+        await self.redis.set(f"{self.name}:exact:{digest}", payload, ex=self.ttl)
+        # Without an embedding the response is only reused for identical requests
+        if embedding is not None:
+            index = await self._get_index()
+            await index.load(
+                [{**tags, "prompt_vector": embedding, "response": payload}],
+                keys=[f"{self.name}:entry:{digest}"],
+                ttl=self.ttl,
+            )
+
+
+def _dumps_pretty(value: Any) -> str:
+    """
+    Serialize a value to JSON indented by two spaces.
+
+    Uses the stdlib rather than orjson so prompts stay byte-identical:
+    orjson writes non-ASCII as raw UTF-8 and formats floats differently.
+    """
+    return json.dumps(value, indent=2)
+
+
+# Maximum number of formatted function schemas kept by _schema_to_str
+SCHEMA_STR_CACHE_SIZE = 128
+
+# Formatted schemas keyed by id(). Each entry keeps its schema alive, so the
+# id can't be reused by another object while the entry is cached.
+_schema_str_cache: dict[int, tuple[dict[str, Any], str]] = {}
+
+
+def _schema_to_str(schema: dict[str, Any]) -> str:
+    """
+    Format a function schema for a prompt, reusing the string for a schema
+    dict that was formatted before.
+
+    Function definitions are usually module constants passed on every call.
+    A schema that is modified in place after first use keeps its old text.
+    """
+    key = id(schema)
+    cached = _schema_str_cache.get(key)
+    if cached is not None and cached[0] is schema:
+        return cached[1]
+
+    text = _dumps_pretty(schema)
+    if len(_schema_str_cache) >= SCHEMA_STR_CACHE_SIZE:
+        # Evict the oldest entry
+        del _schema_str_cache[next(iter(_schema_str_cache))]
+    _schema_str_cache[key] = (schema, text)
+    return text
+
+
+def _convert_embeddings(
+    embeddings: "np.ndarray", dtype: EmbeddingDType
+) -> "np.ndarray | tuple[np.ndarray, np.ndarray]":
+    """Convert float32 embeddings to the requested dtype."""
+    if dtype == "float16":
+        return embeddings.astype("float16")
+    if dtype == "int8":
+        scales = abs(embeddings).max(axis=1, keepdims=True) / 127
+        # All-zero vectors would divide by zero; they quantize to zero anyway
+        scales[scales == 0] = 1
+        return (
+            (embeddings / scales).round().astype("int8"),
+            scales.astype("float16"),
+        )
+    return embeddings
+
+
+def _estimate_output_tokens(prompt: str, max_tokens_hint: int) -> int:
+    """
+    Roughly predict how many tokens a completion will produce.
+
+    Longer prompts tend to get longer answers, so this scales with the prompt's
+    word count, capped at the most the model may produce.
+    """
+    return min(max_tokens_hint, OUTPUT_TOKENS_PER_PROMPT_WORD * len(prompt.split()))
+
+
+async def _gather_chat_completions(
+    create: Callable[..., Awaitable[ChatResponse]],
+    model: str,
+    prompts: list[str],
+    response_format: dict[str, str] | None,
+    functions: list[dict[str, Any]] | None,
+    function_call: dict[str, str] | None,
+    concurrency: int | None,
+) -> list[ChatResponse]:
+    """
+    Run completions for several prompts, with at most ``concurrency``
+    requests in flight (settings.llm_concurrency by default).
+
+    The batch is done when its slowest request is, so prompts are admitted
+    longest predicted output first: the long completions start right away
+    and the short ones fill the remaining slots around them, rather than a
+    long one starting last and holding up the whole batch. Results are
+    returned in prompt order.
+    """
+    semaphore = asyncio.Semaphore(concurrency or get_settings().llm_concurrency)
+
+    async def complete(prompt: str) -> ChatResponse:
+        async with semaphore:
+            return await create(
+                model, prompt, response_format, functions, function_call
+            )
+
+    order = sorted(
+        range(len(prompts)),
+        key=lambda i: _estimate_output_tokens(prompts[i], CHAT_MAX_TOKENS),
+        reverse=True,
+    )
+    # Tasks start in this order, and semaphore waiters are woken first in,
+    # first out, so longer predicted completions are sent first
+    responses = await asyncio.gather(*(complete(prompts[i]) for i in order))
+    responses_by_index = dict(zip(order, responses, strict=True))
+    return [responses_by_index[i] for i in range(len(prompts))]
+
+
+def _estimate_embedding_tokens(text: str) -> int:
+    """
+    Estimate a text's tokens without loading a tokenizer, erring high.
+
+    English averages about four UTF-8 bytes per token and CJK text about
+    three, so counting three bytes per token rarely undercounts.
+    """
+    return len(text.encode()) // 3 + 1
+
+
+def _embedding_batch_limit() -> int:
+    """Size limit for one embeddings API call, see _embedding_request_size."""
+    return EMBEDDING_MAX_BATCH_TOKENS // EMBEDDING_MAX_INPUTS * EMBEDDING_MAX_INPUTS
+
+
+def _embedding_request_size(texts: list[str]) -> int:
+    """
+    Size embedding texts so a single limit covers both per-request caps.
+
+    Each text counts as its estimated tokens, but no less than its equal
+    share of the token budget, so texts whose total size is within
+    _embedding_batch_limit() number at most EMBEDDING_MAX_INPUTS and hold at
+    most EMBEDDING_MAX_BATCH_TOKENS estimated tokens.
+    """
+    floor = EMBEDDING_MAX_BATCH_TOKENS // EMBEDDING_MAX_INPUTS
+    return sum(max(_estimate_embedding_tokens(text), floor) for text in texts)
+
+
+def _split_embedding_request(texts: list[str]) -> list[list[str]]:
+    """Split texts into consecutive slices that each fit in one API call."""
+    limit = _embedding_batch_limit()
+    slices: list[list[str]] = []
+    current: list[str] = []
+    current_size = 0
+    for text in texts:
+        size = _embedding_request_size([text])
+        if current and current_size + size > limit:
+            slices.append(current)
+            current, current_size = [], 0
+        current.append(text)
+        current_size += size
+    if current:
+        slices.append(current)
+    return slices
+
+
+def _is_rejected_request(error: Exception) -> bool:
+    """
+    Whether the provider rejected a request's content, such as a text over
+    the input limit, rather than failing in a way that would fail every
+    request again, such as a rate limit or server error.
+    """
+    return getattr(error, "status_code", None) in (400, 413, 422)
+
+
+def _decode_embedding(embedding: "str | list[float]") -> "np.ndarray | list[float]":
+    """
+    Decode a base64 embedding into a float32 array over its bytes.
+
+    Lists of floats are returned unchanged, since servers compatible with
+    the OpenAI API may ignore the requested encoding format.
+    """
+    if isinstance(embedding, str):
+        import numpy as np
+
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return embedding
+
+
 class AnthropicClientWrapper:
     """Wrapper for Anthropic client"""
 
     def __init__(self, api_key: str | None = None):
         """Initialize the Anthropic client"""
         self.api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
-        self.client = (
-            anthropic.AsyncAnthropic(api_key=self.api_key) if self.api_key else None
-        )
 
-        anthropic_api_key = api_key or os.environ.get("ANTHROPIC_API_KEY")
-
-        if not anthropic_api_key:
+        if not self.api_key:
             raise ValueError("Anthropic API key is required")
 
+        anthropic = _lazy_import("anthropic")
         if anthropic is None:
             raise ImportError(
                 "anthropic package is required for AnthropicClientWrapper"
             )
 
-        self.client = anthropic.AsyncAnthropic(api_key=anthropic_api_key)
+        self.client = anthropic.AsyncAnthropic(api_key=self.api_key)
+
+    async def aclose(self) -> None:
+        """Close the client's HTTP connections"""
+        await self.client.close()
 
     async def create_chat_completion(
         self,
@@ -238,24 +769,63 @@ class AnthropicClientWrapper:
         response_format: dict[str, str] | None = None,
         functions: list[dict[str, Any]] | None = None,
         function_call: dict[str, str] | None = None,
+        semantic_key: str | None = None,
     ) -> ChatResponse:
-        """Create a chat completion using the Anthropic API"""
-        if not self.client:
-            raise ValueError("Anthropic API key is not configured")
-        try:
-            # For Anthropic, we need to handle structured output differently
-            if response_format and response_format.get("type") == "json_object":
-                prompt = f"{prompt}\n\nYou must respond with a valid JSON object."
+        """
+        Create a chat completion, using the chat cache if it is enabled.
 
-            if functions and function_call:
-                # Add function schema to prompt
-                schema = functions[0]["parameters"]
-                prompt = f"{prompt}\n\nYou must respond with a JSON object matching this schema:\n{json.dumps(schema, indent=2)}"
+        Pass ``semantic_key``, the variable text of the prompt, to also reuse
+        responses to semantically similar requests.
+        """
+        cache = await get_semantic_chat_cache()
+        if cache is None:
+            return await self._create_chat_completion(
+                model, prompt, response_format, functions, function_call
+            )
+        return await cache.get_or_create(
+            self._create_chat_completion,
+            model,
+            prompt,
+            response_format,
+            functions,
+            function_call,
+            semantic_key,
+        )
 
+    async def create_chat_completions_batch(
+        self,
+        model: str,
+        prompts: list[str],
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+        concurrency: int | None = None,
+    ) -> list[ChatResponse]:
+        """Create a chat completion for each prompt, in the order given"""
+        return await _gather_chat_completions(
+            self.create_chat_completion,
+            model,
+            prompts,
+            response_format,
+            functions,
+            function_call,
+            concurrency,
+        )
+
+    async def _create_chat_completion(
+        self,
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+    ) -> ChatResponse:
+        """Create a chat completion using the Anthropic API"""
+        try:
             response = await self.client.messages.create(
-                model=model,
-                messages=[{"role": "user", "content": prompt}],
-                max_tokens=1024,
+                **self._request_params(
+                    model, prompt, response_format, functions, function_call
+                )
             )
 
             # Convert to a unified format - safely extract content
@@ -268,26 +838,64 @@ class AnthropicClientWrapper:
             ):
                 content = response.content[0].text
 
-            choices = [{"message": {"content": content}}]
-
-            # Handle both object and dictionary usage formats for testing
-            input_tokens = output_tokens = 0
-            if hasattr(response, "usage"):
-                if isinstance(response.usage, dict):
-                    input_tokens = response.usage.get("input_tokens", 0)
-                    output_tokens = response.usage.get("output_tokens", 0)
-                else:
-                    input_tokens = getattr(response.usage, "input_tokens", 0)
-                    output_tokens = getattr(response.usage, "output_tokens", 0)
+            # Same choice shape as OpenAI and cached responses
+            choices = [_text_choice(content)]
 
-            usage = {"total_tokens": input_tokens + output_tokens}
+            usage = getattr(response, "usage", None)
+            total_tokens = _get_usage_field(usage, "input_tokens") + _get_usage_field(
+                usage, "output_tokens"
+            )
 
-            return ChatResponse(choices=choices, usage=usage)
+            return ChatResponse(choices=choices, usage={"total_tokens": total_tokens})
         except Exception as e:
             logger.error(f"Error creating chat completion with Anthropic: {e}")
             raise
 
-    async def create_embedding(self, query_vec: list[str]) -> np.ndarray:
+    async def stream_chat_completion(
+        self,
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream the text of a chat completion from the Anthropic API"""
+        try:
+            async with self.client.messages.stream(
+                **self._request_params(
+                    model, prompt, response_format, functions, function_call
+                )
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+        except Exception as e:
+            logger.error(f"Error streaming chat completion with Anthropic: {e}")
+            raise
+
+    @staticmethod
+    def _request_params(
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None,
+        functions: list[dict[str, Any]] | None,
+        function_call: dict[str, str] | None,
+    ) -> dict[str, Any]:
+        # For Anthropic, we need to handle structured output differently
+        if response_format and response_format.get("type") == "json_object":
+            prompt = f"{prompt}\n\nYou must respond with a valid JSON object."
+
+        if functions and function_call:
+            # Add function schema to prompt
+            schema = functions[0]["parameters"]
+            prompt = f"{prompt}\n\nYou must respond with a JSON object matching this schema:\n{_schema_to_str(schema)}"
+
+        return {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": CHAT_MAX_TOKENS,
+        }
+
+    async def create_embedding(self, query_vec: list[str]) -> "np.ndarray":
         """
         Create embeddings for the given texts
         Note: Anthropic doesn't offer an embedding API, so we'll use OpenAI's
@@ -302,50 +910,42 @@ class AnthropicClientWrapper:
 class OpenAIClientWrapper:
     """Wrapper for OpenAI client"""
 
+    _embedding_batchers: "dict[str, MicroBatcher[list[str], np.ndarray]] | None" = None
+
     def __init__(self, api_key: str | None = None, base_url: str | None = None):
         """Initialize the OpenAI client based on environment variables"""
-
-        # Regular OpenAI setup
-
         self.api_key = api_key or os.environ.get("OPENAI_API_KEY")
         self.base_url = base_url or os.environ.get("OPENAI_API_BASE")
 
-        if self.api_key:
-            if self.base_url:
-                self.completion_client = AsyncOpenAI(
-                    api_key=self.api_key,
-                    base_url=self.base_url,
-                )
-                self.embedding_client = AsyncOpenAI(
-                    api_key=self.api_key,
-                    base_url=self.base_url,
-                )
-            else:
-                self.completion_client = AsyncOpenAI(api_key=self.api_key)
-                self.embedding_client = AsyncOpenAI(api_key=self.api_key)
-
-        openai_api_base = base_url or os.environ.get("OPENAI_API_BASE")
-        openai_api_key = api_key or os.environ.get("OPENAI_API_KEY")
-
-        if not openai_api_key:
+        if not self.api_key:
             raise ValueError("OpenAI API key is required")
 
-        if AsyncOpenAI is None:
+        async_openai = _lazy_import("AsyncOpenAI")
+        if async_openai is None:
             raise ImportError("openai package is required for OpenAIClientWrapper")
 
-        if openai_api_base:
-            self.completion_client = AsyncOpenAI(
-                api_key=openai_api_key,
-                base_url=openai_api_base,
-            )
-            self.embedding_client = AsyncOpenAI(
-                api_key=openai_api_key,
-                base_url=openai_api_base,
-            )
+        import httpx
+
+        # One client and connection pool serves both completions and
+        # embeddings, so warm connections are reused across endpoints. A
+        # custom client replaces the SDK's own timeout and redirect settings,
+        # so match them; long completions can take minutes.
+        self._http = httpx.AsyncClient(
+            http2=_HTTP2_AVAILABLE,
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+            timeout=httpx.Timeout(OPENAI_HTTP_TIMEOUT, connect=5.0),
+            follow_redirects=True,
+        )
+        self._client = async_openai(
+            api_key=self.api_key,
+            base_url=self.base_url,
+            http_client=self._http,
+        )
+        self.completion_client = self.embedding_client = self._client
 
-        else:
-            self.completion_client = None
-            self.embedding_client = None
+    async def aclose(self) -> None:
+        """Close the client's HTTP connections"""
+        await self._http.aclose()
 
     async def create_chat_completion(
         self,
@@ -354,95 +954,342 @@ class OpenAIClientWrapper:
         response_format: dict[str, str] | None = None,
         functions: list[dict[str, Any]] | None = None,
         function_call: dict[str, str] | None = None,
+        semantic_key: str | None = None,
+    ) -> ChatResponse:
+        """
+        Create a chat completion, using the chat cache if it is enabled.
+
+        Pass ``semantic_key``, the variable text of the prompt, to also reuse
+        responses to semantically similar requests.
+        """
+        cache = await get_semantic_chat_cache()
+        if cache is None:
+            return await self._create_chat_completion(
+                model, prompt, response_format, functions, function_call
+            )
+        return await cache.get_or_create(
+            self._create_chat_completion,
+            model,
+            prompt,
+            response_format,
+            functions,
+            function_call,
+            semantic_key,
+        )
+
+    async def create_chat_completions_batch(
+        self,
+        model: str,
+        prompts: list[str],
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+        concurrency: int | None = None,
+    ) -> list[ChatResponse]:
+        """Create a chat completion for each prompt, in the order given"""
+        return await _gather_chat_completions(
+            self.create_chat_completion,
+            model,
+            prompts,
+            response_format,
+            functions,
+            function_call,
+            concurrency,
+        )
+
+    async def _create_chat_completion(
+        self,
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
     ) -> ChatResponse:
         """Create a chat completion using the OpenAI API"""
-        if not self.completion_client:
-            raise ValueError("OpenAI API key is not configured")
         try:
-            # Build the request parameters
-            request_params = {
-                "model": model,
-                "messages": [{"role": "user", "content": prompt}],
-            }
-
-            # Add optional parameters if provided
-            if response_format:
-                request_params["response_format"] = response_format
-            if functions:
-                request_params["functions"] = functions
-            if function_call:
-                request_params["function_call"] = function_call
-
             response = await self.completion_client.chat.completions.create(
-                **request_params
+                **self._request_params(
+                    model, prompt, response_format, functions, function_call
+                )
             )
 
             # Convert to unified format
-            # Handle both object and dictionary usage formats for testing
-            total_tokens = 0
-            if hasattr(response, "usage"):
-                if isinstance(response.usage, dict):
-                    total_tokens = response.usage.get("total_tokens", 0)
-                else:
-                    total_tokens = getattr(response.usage, "total_tokens", 0)
-
+            usage = getattr(response, "usage", None)
             return ChatResponse(
                 choices=response.choices,
-                usage={"total_tokens": total_tokens},
+                usage={"total_tokens": _get_usage_field(usage, "total_tokens")},
             )
         except Exception as e:
             logger.error(f"Error creating chat completion with OpenAI: {e}")
             raise
 
-    async def create_embedding(self, query_vec: list[str]) -> np.ndarray:
-        """Create embeddings for the given texts"""
-        if not self.embedding_client:
-            raise ValueError("OpenAI API key is not configured")
+    async def stream_chat_completion(
+        self,
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None = None,
+        functions: list[dict[str, Any]] | None = None,
+        function_call: dict[str, str] | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream the text of a chat completion from the OpenAI API"""
+        try:
+            stream = await self.completion_client.chat.completions.create(
+                **self._request_params(
+                    model, prompt, response_format, functions, function_call
+                ),
+                stream=True,
+            )
+            # Close the response even if the caller stops iterating early
+            async with stream:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+        except Exception as e:
+            logger.error(f"Error streaming chat completion with OpenAI: {e}")
+            raise
+
+    @staticmethod
+    def _request_params(
+        model: str,
+        prompt: str,
+        response_format: dict[str, str] | None,
+        functions: list[dict[str, Any]] | None,
+        function_call: dict[str, str] | None,
+    ) -> dict[str, Any]:
+        request_params: dict[str, Any] = {
+            "model": model,
+            "messages": [{"role": "user", "content": prompt}],
+        }
+
+        # Add optional parameters if provided
+        if response_format:
+            request_params["response_format"] = response_format
+        if functions:
+            request_params["functions"] = functions
+        if function_call:
+            request_params["function_call"] = function_call
+        return request_params
+
+    async def create_embedding(
+        self,
+        query_vec: list[str],
+        model: str | None = None,
+        dtype: EmbeddingDType = "float32",
+    ) -> "np.ndarray | tuple[np.ndarray, np.ndarray]":
+        """
+        Create embeddings for the given texts
+
+        Uses DEFAULT_EMBEDDING_MODEL unless a model is given. Requests from
+        concurrent callers that arrive within EMBEDDING_BATCH_LATENCY seconds
+        of each other are combined into one API call of up to
+        EMBEDDING_MAX_INPUTS texts and EMBEDDING_MAX_BATCH_TOKENS estimated
+        tokens, and up to EMBEDDING_CONCURRENCY of those calls run at the
+        same time.
+
+        Embeddings are float32 by default. float16 halves their size with no
+        practical loss in cosine similarity. int8 quarters it: each vector is
+        scaled to [-127, 127] and returned as ``(vectors, scales)``, where
+        ``vectors * scales`` approximates the original embeddings.
+        """
+        if dtype not in get_args(EmbeddingDType):
+            raise ValueError(f"Unsupported embedding dtype: {dtype}")
+        import numpy as np
+
         try:
-            embeddings = []
-            embedding_model = "text-embedding-ada-002"
-
-            # Process in batches of 20 to avoid rate limits
-            batch_size = 20
-            for i in range(0, len(query_vec), batch_size):
-                batch = query_vec[i : i + batch_size]
-                response = await self.embedding_client.embeddings.create(
-                    model=embedding_model,
-                    input=batch,
+            model = model or DEFAULT_EMBEDDING_MODEL
+            # Only requests for the same model can share an API call
+            if self._embedding_batchers is None:
+                self._embedding_batchers = {}
+            batcher = self._embedding_batchers.get(model)
+            if batcher is None:
+                batcher = self._embedding_batchers[model] = MicroBatcher(
+                    partial(self._create_embedding_batch, model),
+                    max_batch_size=_embedding_batch_limit(),
+                    max_latency=EMBEDDING_BATCH_LATENCY,
+                    item_size=_embedding_request_size,
+                    max_concurrency=EMBEDDING_CONCURRENCY,
+                    isolate_error=_is_rejected_request,
                 )
-                batch_embeddings = [item.embedding for item in response.data]
-                embeddings.extend(batch_embeddings)
 
-            return np.array(embeddings, dtype=np.float32)
+            # Slices of a large request are sent concurrently
+            embeddings = await asyncio.gather(
+                *(
+                    batcher.submit(texts)
+                    for texts in _split_embedding_request(query_vec)
+                )
+            )
+
+            if len(embeddings) == 1:
+                result = embeddings[0]
+            elif not embeddings:
+                result = np.empty(
+                    (0, get_embedding_dimensions(model)), dtype=np.float32
+                )
+            else:
+                # Copy each slice straight into one preallocated array
+                result = np.empty(
+                    (len(query_vec), embeddings[0].shape[1]), dtype=np.float32
+                )
+                offset = 0
+                for slice_embeddings in embeddings:
+                    result[offset : offset + len(slice_embeddings)] = slice_embeddings
+                    offset += len(slice_embeddings)
+            return _convert_embeddings(result, dtype)
         except Exception as e:
             logger.error(f"Error creating embedding: {e}")
             raise
 
+    async def _create_embedding_batch(
+        self, model: str, requests: list[list[str]]
+    ) -> "list[np.ndarray]":
+        """Embed the texts of several requests with one API call."""
+        import numpy as np
+
+        inputs = [text for request in requests for text in request]
+        # Base64 responses carry the raw float32 bytes, which decode straight
+        # into an array instead of through a list of Python floats
+        request_params: dict[str, Any] = {
+            "model": model,
+            "input": inputs,
+            "encoding_format": "base64",
+        }
+        dimensions = truncated_embedding_dimensions(model)
+        if dimensions is not None:
+            request_params["dimensions"] = dimensions
+        response = await self.embedding_client.embeddings.create(**request_params)
+
+        if len(response.data) != len(inputs):
+            raise ValueError(
+                f"Expected {len(inputs)} embeddings, got {len(response.data)}"
+            )
+
+        # Fill preallocated arrays row by row rather than converting a nested
+        # list. The width comes from the response, which is authoritative.
+        rows = [_decode_embedding(item.embedding) for item in response.data]
+        dimensions = len(rows[0]) if rows else 0
+
+        # Give each request its own array, in the order it sent its texts, so
+        # a caller's result doesn't keep the whole batch's memory alive
+        results = []
+        offset = 0
+        for request in requests:
+            embeddings = np.empty((len(request), dimensions), dtype=np.float32)
+            for row, vector in enumerate(rows[offset : offset + len(request)]):
+                embeddings[row] = vector
+            results.append(embeddings)
+            offset += len(request)
+        return results
+
 
 # Global LLM client cache
 _model_clients: dict[ModelProvider, OpenAIClientWrapper | AnthropicClientWrapper] = {}
 
+# Client constructors by provider
+PROVIDER_FACTORY: dict[
+    ModelProvider, Callable[[], OpenAIClientWrapper | AnthropicClientWrapper]
+] = {
+    ModelProvider.OPENAI: lambda: OpenAIClientWrapper(
+        api_key=os.environ.get("OPENAI_API_KEY")
+    ),
+    ModelProvider.ANTHROPIC: lambda: AnthropicClientWrapper(
+        api_key=os.environ.get("ANTHROPIC_API_KEY")
+    ),
+}
+
 
 async def get_model_client(
     provider: ModelProvider | str,
 ) -> OpenAIClientWrapper | AnthropicClientWrapper:
     """Get a client for the given provider, caching the instance per provider."""
 
-    global _model_clients
-
-    provider_enum = (
-        provider if isinstance(provider, ModelProvider) else ModelProvider(provider)
+    # ModelProvider members hash and compare equal to their string values,
+    # so cached clients are found without converting the provider first
+    client = _model_clients.get(provider)
+    if client is not None:
+        return client
+
+    provider_enum = ModelProvider(provider)
+    factory = PROVIDER_FACTORY.get(provider_enum)
+    if factory is None:
+        raise ValueError(f"Unsupported model provider: {provider_enum}")
+
+    # Clients are built synchronously, with no await between the cache check
+    # and the store, so concurrent cold callers can't build duplicate clients.
+    # Guard this with a lock if construction ever becomes async.
+    client = _model_clients[provider_enum] = factory()
+    return client
+
+
+async def close_model_clients() -> None:
+    """Close and forget the cached provider clients, e.g. on shutdown."""
+    clients = list(_model_clients.values())
+    _model_clients.clear()
+    for client in clients:
+        try:
+            await client.aclose()
+        except Exception as e:
+            logger.warning(f"Error closing model client: {e}")
+
+
+async def create_chat_completion_batch(
+    model: str,
+    prompts: list[str],
+    response_format: dict[str, str] | None = None,
+    functions: list[dict[str, Any]] | None = None,
+    function_call: dict[str, str] | None = None,
+    concurrency: int | None = None,
+) -> list[ChatResponse]:
+    """
+    Create a chat completion for each prompt with the client for the model's
+    provider.
+
+    Args:
+        model: The model name
+        prompts: The prompts to complete
+        response_format: Optional response format
+        functions: Optional function definitions
+        function_call: Optional function call
+        concurrency: Maximum requests in flight. Defaults to
+            settings.llm_concurrency
+
+    Returns:
+        One response per prompt, in the same order
+    """
+    client = await get_model_client(get_model_config(model).provider)
+    return await client.create_chat_completions_batch(
+        model,
+        prompts,
+        response_format=response_format,
+        functions=functions,
+        function_call=function_call,
+        concurrency=concurrency,
     )
 
-    if provider_enum not in _model_clients:
-        client: OpenAIClientWrapper | AnthropicClientWrapper | None = None
-        if provider_enum == ModelProvider.OPENAI:
-            client = OpenAIClientWrapper(api_key=os.environ.get("OPENAI_API_KEY"))
-        elif provider_enum == ModelProvider.ANTHROPIC:
-            client = AnthropicClientWrapper(api_key=os.environ.get("ANTHROPIC_API_KEY"))
-        else:
-            raise ValueError(f"Unsupported model provider: {provider_enum}")
 
-        _model_clients[provider_enum] = client
+# Shared chat completion cache, created on first use when enabled
+_chat_cache: SemanticChatCache | None = None
+
 
-    return _model_clients[provider_enum]
+async def get_semantic_chat_cache() -> SemanticChatCache | None:
+    """Get the shared chat completion cache, or None if it is disabled."""
+    global _chat_cache
+
+    settings = get_settings()
+    if not settings.enable_semantic_chat_cache:
+        return None
+
+    if _chat_cache is None:
+        from agent_memory_server.utils.redis import get_redis_conn
+
+        async def embed(texts: list[str]) -> "np.ndarray":
+            client = await get_model_client(ModelProvider.OPENAI)
+            return await client.create_embedding(texts, dtype="float16")
+
+        _chat_cache = SemanticChatCache(
+            redis=await get_redis_conn(),
+            embed=embed,
+            distance_threshold=settings.semantic_chat_cache_distance_threshold,
+            ttl=settings.semantic_chat_cache_ttl,
+            dimensions=get_embedding_dimensions(DEFAULT_EMBEDDING_MODEL),
+        )
+    return _chat_cache
@@ -3,18 +3,21 @@ import sys
 
 import structlog
 
-from agent_memory_server.config import settings
-
 
 _configured = False
 
 
 def configure_logging():
     """Configure structured logging for the application"""
+    # Imported here because config imports this module for get_logger
+    from agent_memory_server.config import get_settings
+
     global _configured
     if _configured:
         return
 
+    settings = get_settings()
+
     # Configure standard library logging based on settings.log_level
     level = getattr(logging, settings.log_level.upper(), logging.INFO)
     handler = logging.StreamHandler(sys.stdout)
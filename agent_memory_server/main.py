@@ -11,7 +11,12 @@ from agent_memory_server.auth import verify_auth_config
 from agent_memory_server.config import settings
 from agent_memory_server.docket_tasks import register_tasks
 from agent_memory_server.healthcheck import router as health_router
-from agent_memory_server.llms import MODEL_CONFIGS, ModelProvider
+from agent_memory_server.llms import (
+    MODEL_CONFIGS,
+    ModelProvider,
+    close_model_clients,
+    get_embedding_dimensions,
+)
 from agent_memory_server.logging import get_logger
 from agent_memory_server.utils.redis import (
     _redis_pool as connection_pool,
@@ -83,7 +88,7 @@ async def lifespan(app: FastAPI):
         # Get embedding dimensions from model config
         embedding_model_config = MODEL_CONFIGS.get(settings.embedding_model)
         vector_dimensions = (
-            str(embedding_model_config.embedding_dimensions)
+            str(get_embedding_dimensions(settings.embedding_model))
             if embedding_model_config
             else "1536"
         )
@@ -144,6 +149,7 @@ async def lifespan(app: FastAPI):
     yield
 
     logger.info("Shutting down Redis Agent Memory Server")
+    await close_model_clients()
     if connection_pool is not None:
         await connection_pool.aclose()
 
@@ -0,0 +1,154 @@
+"""Micro-batching utilities."""
+
+import asyncio
+from collections.abc import Awaitable, Callable
+
+
+class MicroBatcher[T, R]:
+    """
+    Coalesce concurrent single-item requests into batched calls.
+
+    Each call to ``submit`` queues one item. A worker task collects queued
+    items until ``max_batch_size`` is reached or ``max_latency`` seconds have
+    passed since the first item in the batch arrived, then processes them
+    with a single call to ``process_batch``. If ``item_size`` is given, the
+    batch size is the sum of item sizes rather than the number of items; an
+    item that is larger than ``max_batch_size`` on its own is processed in a
+    batch by itself. Up to ``max_concurrency`` batches are processed at once.
+
+    A failed batch raises its error to every item in it, unless
+    ``isolate_error`` returns True for the error. The items are then
+    processed again one at a time, so an item the batch was rejected for only
+    fails its own caller.
+
+    The worker exits when the queue is empty and is started again by the next
+    submission, so nothing keeps running between bursts of work. Queues are
+    tied to the event loop they were created on and are replaced when used
+    from a different loop.
+    """
+
+    def __init__(
+        self,
+        process_batch: Callable[[list[T]], Awaitable[list[R]]],
+        max_batch_size: int = 32,
+        max_latency: float = 0.01,
+        item_size: Callable[[T], int] | None = None,
+        max_concurrency: int = 1,
+        isolate_error: Callable[[Exception], bool] | None = None,
+    ):
+        """
+        Args:
+            process_batch: Async function returning one result per item, in order
+            max_batch_size: Maximum total size of the items processed together
+            max_latency: Seconds to wait for more items before processing a batch
+            item_size: Function giving the size of an item. Defaults to 1 per item
+            max_concurrency: Maximum number of batches processed at the same time
+            isolate_error: Function deciding whether a batch error should be
+                retried item by item. Defaults to never
+        """
+        self.process_batch = process_batch
+        self.max_batch_size = max_batch_size
+        self.max_latency = max_latency
+        self.item_size = item_size
+        self.max_concurrency = max_concurrency
+        self.isolate_error = isolate_error
+        self._queue: asyncio.Queue[tuple[T, asyncio.Future[R]]] | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+        self._worker: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        # Keep references to running batches so they aren't garbage collected
+        self._tasks: set[asyncio.Task[None]] = set()
+
+    async def submit(self, item: T) -> R:
+        """
+        Queue an item and wait for its result.
+
+        Args:
+            item: The item to process
+
+        Returns:
+            The result for this item
+
+        Raises:
+            Exception: Whatever ``process_batch`` raised for the item's batch
+        """
+        loop = asyncio.get_running_loop()
+        if self._queue is None or self._loop is not loop:
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+            self._worker = None
+
+        future: asyncio.Future[R] = loop.create_future()
+        self._queue.put_nowait((item, future))
+        if self._worker is None or self._worker.done():
+            self._worker = loop.create_task(self._run(self._queue, self._semaphore))
+        return await future
+
+    async def _run(
+        self,
+        queue: asyncio.Queue[tuple[T, asyncio.Future[R]]],
+        semaphore: asyncio.Semaphore,
+    ) -> None:
+        loop = asyncio.get_running_loop()
+        # An entry that didn't fit in the previous batch starts the next one
+        carried: tuple[T, asyncio.Future[R]] | None = None
+        while carried is not None or not queue.empty():
+            # Wait for a free slot before collecting, so items that arrive
+            # while every slot is busy can still join the next batch
+            await semaphore.acquire()
+            entry = carried if carried is not None else queue.get_nowait()
+            carried = None
+            batch = [entry]
+            batch_size = self._size(entry[0])
+            deadline = loop.time() + self.max_latency
+            while batch_size < self.max_batch_size:
+                if queue.empty():
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        entry = await asyncio.wait_for(queue.get(), timeout)
+                    except TimeoutError:
+                        break
+                else:
+                    entry = queue.get_nowait()
+
+                size = self._size(entry[0])
+                if batch_size + size > self.max_batch_size:
+                    carried = entry
+                    break
+                batch.append(entry)
+                batch_size += size
+
+            task = loop.create_task(self._process(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            task.add_done_callback(lambda _: semaphore.release())
+
+    def _size(self, item: T) -> int:
+        return self.item_size(item) if self.item_size is not None else 1
+
+    async def _process(self, batch: list[tuple[T, asyncio.Future[R]]]) -> None:
+        try:
+            results = await self.process_batch([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError(
+                    f"Expected {len(batch)} batch results, got {len(results)}"
+                )
+        except Exception as e:
+            if (
+                len(batch) > 1
+                and self.isolate_error is not None
+                and self.isolate_error(e)
+            ):
+                await asyncio.gather(*(self._process([entry]) for entry in batch))
+                return
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results, strict=True):
+            if not future.done():
+                future.set_result(result)
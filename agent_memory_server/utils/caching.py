@@ -0,0 +1,48 @@
+"""In-memory caching utilities."""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache[K, V]:
+    """
+    A bounded, thread-safe least-recently-used cache.
+
+    Used for results that are looked up from the event loop and stored from
+    worker threads, where ``functools.lru_cache`` doesn't fit because results
+    are computed in batches rather than by calling a cached function.
+    """
+
+    def __init__(self, maxsize: int):
+        """
+        Args:
+            maxsize: Maximum number of entries kept before the least recently
+                used one is evicted
+        """
+        self.maxsize = maxsize
+        self._data: OrderedDict[K, V] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: K) -> V | None:
+        """Return the cached value for key, or None, marking it recently used."""
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key: K, value: V) -> None:
+        """Cache a value, evicting the least recently used entry if full."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            if len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def cache_clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -43,6 +43,7 @@ except Exception as e:
     logging.warning(f"Could not patch RedisVL ULID function: {e}")
 
 from agent_memory_server.config import settings
+from agent_memory_server.llms import truncated_embedding_dimensions
 from agent_memory_server.vectorstore_adapter import (
     LangChainVectorStoreAdapter,
     MemoryRedisVectorStore,
@@ -71,11 +72,13 @@ def create_embeddings() -> Embeddings:
                 api_key = SecretStr(settings.openai_api_key)
                 return OpenAIEmbeddings(
                     model=settings.embedding_model,
+                    dimensions=truncated_embedding_dimensions(settings.embedding_model),
                     api_key=api_key,
                 )
             # Default: handle API key from environment
             return OpenAIEmbeddings(
                 model=settings.embedding_model,
+                dimensions=truncated_embedding_dimensions(settings.embedding_model),
             )
         except ImportError:
             logger.error(
@@ -100,10 +103,12 @@ def create_embeddings() -> Embeddings:
                 api_key = SecretStr(settings.openai_api_key)
                 return OpenAIEmbeddings(
                     model="text-embedding-3-small",
+                    dimensions=truncated_embedding_dimensions("text-embedding-3-small"),
                     api_key=api_key,
                 )
             return OpenAIEmbeddings(
                 model="text-embedding-3-small",
+                dimensions=truncated_embedding_dimensions("text-embedding-3-small"),
             )
         except ImportError:
             logger.error(
@@ -215,7 +220,11 @@ def create_redis_vectorstore(embeddings: Embeddings) -> VectorStore:
                 index_name=settings.redisvl_index_name,
                 metadata_schema=metadata_schema,
                 distance_metric=settings.redisvl_distance_metric,
-                embedding_dimensions=int(settings.redisvl_vector_dimensions),
+                # Shortened embeddings need an index of the same width
+                embedding_dimensions=truncated_embedding_dimensions(
+                    settings.embedding_model
+                )
+                or int(settings.redisvl_vector_dimensions),
             ),
         )
     except ImportError:
@@ -35,14 +35,14 @@ from unittest.mock import Mock
 
 import numpy as np
 
-from agent_memory_server.extraction import _bertopic_cache, extract_topics_bertopic
+from agent_memory_server.extraction import extract_topics_bertopic, topic_cache
 
 
 @pytest.fixture(autouse=True)
 def clear_cache():
-    _bertopic_cache.clear()
+    topic_cache.cache_clear()
     yield
-    _bertopic_cache.clear()
+    topic_cache.cache_clear()
 
 
 @pytest.fixture
@@ -64,9 +64,21 @@ class TestTopicCaching:
         mock_bertopic.transform.assert_called_once_with([text])
 
     @patch("agent_memory_server.extraction.get_topic_model")
-    def test_cache_key_includes_num_topics(self, mock_get_topic_model, mock_bertopic):
+    def test_cache_shared_across_num_topics(self, mock_get_topic_model, mock_bertopic):
         mock_get_topic_model.return_value = mock_bertopic
+        mock_bertopic.get_topic.side_effect = lambda x: [
+            ("technology", 0.8),
+            ("science", 0.6),
+            ("research", 0.4),
+        ]
         text = "Testing caching"
-        _ = extract_topics_bertopic(text, num_topics=2)
-        _ = extract_topics_bertopic(text, num_topics=3)
-        assert mock_bertopic.transform.call_count == 2
+        assert extract_topics_bertopic(text, num_topics=2) == [
+            "technology",
+            "science",
+        ]
+        assert extract_topics_bertopic(text, num_topics=3) == [
+            "technology",
+            "science",
+            "research",
+        ]
+        mock_bertopic.transform.assert_called_once_with([text])
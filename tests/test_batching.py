@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+from agent_memory_server.utils.batching import MicroBatcher
+
+
+@pytest.mark.asyncio
+class TestMicroBatcher:
+    async def test_concurrent_submissions_are_batched(self):
+        """Test that concurrent items are processed in batches of max_batch_size"""
+        batches = []
+
+        async def process_batch(items):
+            batches.append(items)
+            return [item * 2 for item in items]
+
+        batcher = MicroBatcher(process_batch, max_batch_size=3, max_latency=0.01)
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+
+        assert results == [0, 2, 4, 6, 8]
+        assert batches == [[0, 1, 2], [3, 4]]
+
+    async def test_batch_errors_are_raised_to_every_caller(self):
+        """Test that a failed batch fails each submission in it"""
+
+        async def process_batch(items):
+            raise RuntimeError("batch failed")
+
+        batcher = MicroBatcher(process_batch)
+
+        results = await asyncio.gather(
+            batcher.submit("a"), batcher.submit("b"), return_exceptions=True
+        )
+
+        assert all(isinstance(result, RuntimeError) for result in results)
+
+    async def test_isolated_errors_only_fail_offending_items(self):
+        """Test that an isolated batch error is retried item by item"""
+        batches = []
+
+        async def process_batch(items):
+            batches.append(items)
+            if "bad" in items:
+                raise ValueError("bad item")
+            return [item.upper() for item in items]
+
+        batcher = MicroBatcher(
+            process_batch,
+            isolate_error=lambda e: isinstance(e, ValueError),
+        )
+
+        results = await asyncio.gather(
+            batcher.submit("a"),
+            batcher.submit("bad"),
+            batcher.submit("b"),
+            return_exceptions=True,
+        )
+
+        assert results[0] == "A"
+        assert isinstance(results[1], ValueError)
+        assert results[2] == "B"
+        assert batches == [["a", "bad", "b"], ["a"], ["bad"], ["b"]]
+
+    async def test_item_size_limits_batch_total(self):
+        """Test that batches are limited by total item size when sizes are given"""
+        batches = []
+
+        async def process_batch(items):
+            batches.append(items)
+            return [len(item) for item in items]
+
+        batcher = MicroBatcher(process_batch, max_batch_size=4, item_size=len)
+
+        results = await asyncio.gather(
+            batcher.submit("aa"),
+            batcher.submit("bb"),
+            batcher.submit("c"),
+            batcher.submit("dddddd"),
+        )
+
+        assert results == [2, 2, 1, 6]
+        # An oversized item is processed on its own
+        assert batches == [["aa", "bb"], ["c"], ["dddddd"]]
+
+    async def test_max_concurrency_limits_batches_in_flight(self):
+        """Test that up to max_concurrency batches are processed at once"""
+        in_flight = 0
+        peak = 0
+
+        async def process_batch(items):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return items
+
+        batcher = MicroBatcher(
+            process_batch, max_batch_size=1, max_latency=0, max_concurrency=2
+        )
+
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(6)))
+
+        assert results == list(range(6))
+        assert peak == 2
@@ -0,0 +1,44 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from agent_memory_server.utils.caching import LRUCache
+
+
+class TestLRUCache:
+    def test_evicts_least_recently_used(self):
+        """Test that reading an entry keeps it over older unread entries"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+        cache.set("b", 2)
+
+        assert cache.get("a") == 1
+        cache.set("c", 3)
+
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert len(cache) == 2
+
+    def test_cache_clear(self):
+        """Test that cache_clear removes every entry"""
+        cache = LRUCache(maxsize=2)
+        cache.set("a", 1)
+
+        cache.cache_clear()
+
+        assert cache.get("a") is None
+        assert len(cache) == 0
+
+    def test_concurrent_access_from_threads(self):
+        """Test that reads and evicting writes from many threads stay consistent"""
+        cache = LRUCache(maxsize=8)
+
+        def worker(offset):
+            for i in range(2000):
+                key = (offset + i) % 16
+                cache.set(key, key)
+                cache.get((key + 1) % 16)
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            list(pool.map(worker, range(8)))
+
+        assert len(cache) == 8
@@ -1,6 +1,10 @@
 import logging
+import os
 
-from agent_memory_server.config import get_config
+import pytest
+
+from agent_memory_server import config
+from agent_memory_server.config import Settings, get_config, get_settings
 from agent_memory_server.logging import configure_logging
 
 
@@ -15,3 +19,57 @@ def test_get_config_missing_file_logs_warning(caplog, monkeypatch):
         and record.config_file == "missing_file.yaml"
         for record in caplog.records
     )
+
+
+def test_settings_are_created_once_and_shared():
+    assert get_settings() is get_settings()
+    assert config.settings is get_settings()
+
+
+def test_model_config_is_memoized_and_follows_model_changes():
+    settings = Settings(generation_model="gpt-4o", embedding_model="unknown-model")
+
+    assert settings.generation_model_config is settings.generation_model_config
+    assert settings.generation_model_config["provider"] == "openai"
+    assert settings.embedding_model_config == {}
+
+    settings.generation_model = "claude-3-opus-latest"
+    assert settings.generation_model_config["provider"] == "anthropic"
+
+    with pytest.raises(TypeError):
+        settings.generation_model_config["provider"] = "openai"
+    with pytest.raises(TypeError):
+        config.MODEL_CONFIGS["new-model"] = {"provider": "openai"}
+
+
+def test_get_config_reparses_file_only_when_it_changes(tmp_path, monkeypatch):
+    config_file = tmp_path / "config.yaml"
+    config_file.write_text("port: 8001\n")
+    monkeypatch.setenv("REDIS_MEMORY_CONFIG", str(config_file))
+    config._load_config_file.cache_clear()
+
+    first = get_config()
+    first["port"] = 9999
+    second = get_config()
+    assert second["port"] == 8001
+    assert config._load_config_file.cache_info().misses == 1
+
+    config_file.write_text("port: 8002\n")
+    st = config_file.stat()
+    os.utime(config_file, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000))
+    assert get_config()["port"] == 8002
+    assert config._load_config_file.cache_info().misses == 2
+
+
+def test_get_config_env_overrides_follow_environment_changes(monkeypatch):
+    monkeypatch.setenv("REDIS_MEMORY_PORT", "8001")
+    assert get_config()["port"] == "8001"
+
+    monkeypatch.setenv("REDIS_MEMORY_PORT", "8002")
+    assert get_config()["port"] == "8002"
+
+    monkeypatch.setenv("REDIS_MEMORY_MCP_PORT", "9001")
+    assert get_config()["mcp_port"] == "9001"
+
+    monkeypatch.delenv("REDIS_MEMORY_PORT")
+    assert "port" not in get_config()
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from unittest.mock import AsyncMock, Mock, patch
 
@@ -11,7 +12,10 @@ import agent_memory_server.extraction as extraction_module
 from agent_memory_server.extraction import (
     extract_discrete_memories,
     extract_entities,
+    extract_entities_batch,
+    extract_entities_batched,
     extract_topics_bertopic,
+    extract_topics_bertopic_batched,
     extract_topics_llm,
     handle_extraction,
 )
@@ -19,6 +23,16 @@ from agent_memory_server.filters import DiscreteMemoryExtracted, MemoryType
 from agent_memory_server.models import MemoryRecord, MemoryTypeEnum
 
 
+@pytest.fixture(autouse=True)
+def clear_extraction_caches():
+    """Reset the in-memory extraction caches between tests"""
+    extraction_module.entity_cache.cache_clear()
+    extraction_module.topic_cache.cache_clear()
+    yield
+    extraction_module.entity_cache.cache_clear()
+    extraction_module.topic_cache.cache_clear()
+
+
 @pytest.fixture
 def mock_bertopic():
     """Mock BERTopic model"""
@@ -34,13 +48,16 @@ def mock_bertopic():
 def mock_ner():
     """Mock NER pipeline"""
 
-    def mock_ner_fn(text):
-        return [
-            {"word": "John", "entity": "PER", "score": 0.99},
-            {"word": "Google", "entity": "ORG", "score": 0.98},
-            {"word": "Mountain", "entity": "LOC", "score": 0.97},
-            {"word": "##View", "entity": "LOC", "score": 0.97},
-        ]
+    entities = [
+        {"word": "John", "entity_group": "PER", "score": 0.99},
+        {"word": "Google", "entity_group": "ORG", "score": 0.98},
+        {"word": "Mountain View", "entity_group": "LOC", "score": 0.97},
+    ]
+
+    def mock_ner_fn(inputs, **kwargs):
+        if isinstance(inputs, list):
+            return [list(entities) for _ in inputs]
+        return list(entities)
 
     return Mock(side_effect=mock_ner_fn)
 
@@ -102,6 +119,44 @@ class TestTopicExtraction:
         assert topics == []
         mock_bertopic.transform.assert_called_once()
 
+    @patch("agent_memory_server.extraction.get_topic_model")
+    async def test_extract_topics_batched_shares_one_transform(
+        self, mock_get_topic_model, mock_bertopic
+    ):
+        """Test that concurrent calls are transformed together and cached"""
+        mock_bertopic.transform.side_effect = lambda texts: (
+            np.array([1] * len(texts)),
+            np.array([0.8] * len(texts)),
+        )
+        mock_get_topic_model.return_value = mock_bertopic
+
+        results = await asyncio.gather(
+            extract_topics_bertopic_batched("First text"),
+            extract_topics_bertopic_batched("Second text"),
+            extract_topics_bertopic_batched("First text"),
+        )
+
+        for topics in results:
+            assert topics == ["technology", "business"]
+        mock_bertopic.transform.assert_called_once_with(["First text", "Second text"])
+
+        # The sync path sees results cached by the batched path
+        assert extract_topics_bertopic("Second text") == ["technology", "business"]
+        mock_bertopic.transform.assert_called_once()
+
+    async def test_extract_topics_llm_opts_in_to_semantic_cache(self):
+        """Test that LLM topic extraction matches cached answers on its text"""
+        text = "Discussion about AI technology and business"
+        client = AsyncMock()
+        client.create_chat_completion.return_value = Mock(
+            choices=[Mock(message=Mock(content='{"topics": ["AI", "business"]}'))]
+        )
+
+        topics = await extract_topics_llm(text, num_topics=2, client=client)
+
+        assert topics == ["AI", "business"]
+        assert client.create_chat_completion.call_args.kwargs["semantic_key"] == text
+
 
 @pytest.mark.asyncio
 class TestEntityExtraction:
@@ -113,9 +168,31 @@ class TestEntityExtraction:
 
         entities = extract_entities(text)
 
-        assert set(entities) == {"John", "Google", "MountainView"}
+        assert set(entities) == {"John", "Google", "Mountain View"}
         mock_ner.assert_called_once_with(text)
 
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_keeps_first_seen_order(self, mock_get_ner_model):
+        """Test that duplicate entities are dropped in order of appearance"""
+        mock_get_ner_model.return_value = Mock(
+            return_value=[
+                {"word": "Google", "entity_group": "ORG", "score": 0.98},
+                {"word": "John", "entity_group": "PER", "score": 0.99},
+                {"word": "Google", "entity_group": "ORG", "score": 0.95},
+            ]
+        )
+
+        entities = extract_entities("Google hired John, and Google is big")
+
+        assert entities == ["Google", "John"]
+
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_skips_trivial_text(self, mock_get_ner_model):
+        """Test that text below min_extraction_chars never reaches the model"""
+        assert extract_entities("  ok  ") == []
+        assert extract_entities_batch(["hi", "   "]) == [[], []]
+        mock_get_ner_model.assert_not_called()
+
     @patch("agent_memory_server.extraction.get_ner_model")
     async def test_extract_entities_error(self, mock_get_ner_model):
         """Test handling of NER model error"""
@@ -129,7 +206,6 @@ class TestEntityExtraction:
     async def test_extract_entities_cache_hit(self, mock_get_ner_model, mock_ner):
         """Test that results are cached on repeated calls."""
         mock_get_ner_model.return_value = mock_ner
-        extraction_module._entity_cache.clear()
         text = "John works at Google in Mountain View"
 
         first = extract_entities(text)
@@ -143,7 +219,6 @@ class TestEntityExtraction:
     async def test_extract_entities_cache_miss(self, mock_get_ner_model, mock_ner):
         """Test that different text results in a cache miss."""
         mock_get_ner_model.return_value = mock_ner
-        extraction_module._entity_cache.clear()
 
         extract_entities("First text")
         assert mock_ner.call_count == 1
@@ -151,11 +226,98 @@ class TestEntityExtraction:
         extract_entities("Second text")
         assert mock_ner.call_count == 2
 
+    async def test_get_ner_model_builds_pipeline_once(self):
+        """Test that the NER pipeline is constructed once and then reused."""
+        mock_torch = Mock()
+        mock_torch.cuda.is_available.return_value = False
+        mock_transformers = Mock()
+        with (
+            patch.object(extraction_module, "_ner_pipeline", None),
+            patch.dict(
+                "sys.modules",
+                {"torch": mock_torch, "transformers": mock_transformers},
+            ),
+        ):
+            first = extraction_module.get_ner_model()
+            second = extraction_module.get_ner_model()
+
+        assert first is second
+        mock_transformers.pipeline.assert_called_once()
+        call_kwargs = mock_transformers.pipeline.call_args.kwargs
+        assert call_kwargs["aggregation_strategy"] == "simple"
+        # Without CUDA, the pipeline runs the int8-quantized model on CPU
+        quantize_dynamic = mock_torch.ao.quantization.quantize_dynamic
+        quantize_dynamic.assert_called_once()
+        assert call_kwargs["model"] is quantize_dynamic.return_value
+        assert call_kwargs["device"] == -1
+
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_batch(self, mock_get_ner_model, mock_ner):
+        """Test that a batch of texts shares a single pipeline call."""
+        mock_get_ner_model.return_value = mock_ner
+
+        results = extract_entities_batch(["First text", "Second text", "First text"])
+
+        assert len(results) == 3
+        for entities in results:
+            assert set(entities) == {"John", "Google", "Mountain View"}
+        mock_ner.assert_called_once_with(["First text", "Second text"], batch_size=16)
+
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_batch_shares_cache(
+        self, mock_get_ner_model, mock_ner
+    ):
+        """Test that batch extraction reads and fills the single-text cache."""
+        mock_get_ner_model.return_value = mock_ner
+        extract_entities("First text")
+
+        extract_entities_batch(["First text", "Second text"])
+        mock_ner.assert_called_with(["Second text"], batch_size=16)
+
+        assert set(extract_entities("Second text")) == {
+            "John",
+            "Google",
+            "Mountain View",
+        }
+        assert mock_ner.call_count == 2
+
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_batched_coalesces_callers(
+        self, mock_get_ner_model, mock_ner
+    ):
+        """Test that concurrent callers share one pipeline call."""
+        mock_get_ner_model.return_value = mock_ner
+
+        first, second = await asyncio.gather(
+            extract_entities_batched("First text"),
+            extract_entities_batched("Second text"),
+        )
+
+        assert set(first) == set(second) == {"John", "Google", "Mountain View"}
+        mock_ner.assert_called_once_with(["First text", "Second text"], batch_size=16)
+        # Later calls are answered from the shared cache
+        assert set(await extract_entities_batched("First text")) == set(first)
+        mock_ner.assert_called_once()
+
+    @patch("agent_memory_server.extraction.get_ner_model")
+    async def test_extract_entities_error_not_cached(
+        self, mock_get_ner_model, mock_ner
+    ):
+        """Test that a failed extraction is retried on the next call."""
+        mock_get_ner_model.side_effect = [Exception("Model error"), mock_ner]
+        text = "John works at Google in Mountain View"
+
+        assert extract_entities(text) == []
+        assert set(extract_entities(text)) == {"John", "Google", "Mountain View"}
+
 
 @pytest.mark.asyncio
 class TestHandleExtraction:
     @patch("agent_memory_server.extraction.extract_topics_llm")
-    @patch("agent_memory_server.extraction.extract_entities")
+    @patch(
+        "agent_memory_server.extraction.extract_entities_batched",
+        new_callable=AsyncMock,
+    )
     async def test_handle_extraction(
         self, mock_extract_entities, mock_extract_topics_llm
     ):
@@ -178,7 +340,10 @@ class TestHandleExtraction:
         assert len(entities) == 3
 
     @patch("agent_memory_server.extraction.extract_topics_llm")
-    @patch("agent_memory_server.extraction.extract_entities")
+    @patch(
+        "agent_memory_server.extraction.extract_entities_batched",
+        new_callable=AsyncMock,
+    )
     async def test_handle_extraction_disabled_features(
         self, mock_extract_entities, mock_extract_topics_llm
     ):
@@ -206,6 +371,17 @@ class TestHandleExtraction:
 class TestDiscreteMemoryExtraction:
     """Test the extract_discrete_memories function"""
 
+    async def test_prompt_parts_match_formatted_prompt(self):
+        """Test that the pre-split prompt renders the same text as format()"""
+        text = "User prefers {window} seats"
+        prefix, suffix = extraction_module._discrete_extraction_prompt_parts(5)
+
+        assert prefix + text + suffix == (
+            extraction_module.DISCRETE_EXTRACTION_PROMPT.format(
+                message=text, top_k_topics=5
+            )
+        )
+
     @patch("agent_memory_server.long_term_memory.index_long_term_memories")
     @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
     @patch("agent_memory_server.extraction.get_model_client")
@@ -287,8 +463,12 @@ class TestDiscreteMemoryExtraction:
         )
 
         # Verify that extracted memories were indexed
-        mock_index_memories.assert_called_once()
-        indexed_memories = mock_index_memories.call_args[0][0]
+        assert mock_index_memories.call_count >= 1
+        indexed_memories = [
+            memory
+            for call in mock_index_memories.call_args_list
+            for memory in call[0][0]
+        ]
         assert len(indexed_memories) == len(
             unprocessed_memories
         )  # One extracted memory per message
@@ -372,6 +552,109 @@ class TestDiscreteMemoryExtraction:
         # Verify that LLM was not called
         mock_client.create_chat_completion.assert_not_called()
 
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_deletes_empty_memories_together(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+    ):
+        """Test that all empty memories are deleted with a single call"""
+        empty_memories = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text="",
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for _ in range(3)
+        ]
+        mock_adapter = AsyncMock()
+        mock_get_adapter.return_value = mock_adapter
+        mock_get_client.return_value = AsyncMock()
+
+        await extract_discrete_memories(memories=empty_memories)
+
+        mock_adapter.delete_memories.assert_called_once_with(
+            [memory.id for memory in empty_memories]
+        )
+
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_skips_trivial_text(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+    ):
+        """Test that trivially short messages are marked processed without the LLM"""
+        short_memory = MemoryRecord(
+            id=str(ulid.ULID()),
+            text="ok!",
+            memory_type=MemoryTypeEnum.MESSAGE,
+            discrete_memory_extracted="f",
+        )
+        mock_adapter = AsyncMock()
+        mock_get_adapter.return_value = mock_adapter
+        mock_client = AsyncMock()
+        mock_get_client.return_value = mock_client
+
+        await extract_discrete_memories(memories=[short_memory])
+
+        mock_client.create_chat_completion.assert_not_called()
+        updated_memories = mock_adapter.update_memories.call_args[0][0]
+        assert [m.id for m in updated_memories] == [short_memory.id]
+        assert updated_memories[0].discrete_memory_extracted == "t"
+
+    @patch("agent_memory_server.extraction._get_token_encoding")
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_skips_oversized_prompts(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+        mock_get_token_encoding,
+    ):
+        """Test that messages too long for the model are skipped and marked"""
+        # One token per word
+        mock_get_token_encoding.return_value = Mock(encode=lambda text: text.split())
+        extraction_module._discrete_prompt_overhead_tokens.cache_clear()
+        long_memory = MemoryRecord(
+            id=str(ulid.ULID()),
+            text="word " * 200_000,
+            memory_type=MemoryTypeEnum.MESSAGE,
+            discrete_memory_extracted="f",
+        )
+        mock_adapter = AsyncMock()
+        mock_get_adapter.return_value = mock_adapter
+        mock_client = AsyncMock()
+        mock_get_client.return_value = mock_client
+
+        try:
+            await extract_discrete_memories(memories=[long_memory])
+        finally:
+            extraction_module._discrete_prompt_overhead_tokens.cache_clear()
+
+        mock_client.create_chat_completion.assert_not_called()
+        updated_memories = mock_adapter.update_memories.call_args[0][0]
+        assert [m.id for m in updated_memories] == [long_memory.id]
+        assert updated_memories[0].discrete_memory_extracted == "t"
+
+    async def test_get_token_encoding_retries_failed_loads(self):
+        """Test that a failed encoding load isn't cached for later calls"""
+        mock_tiktoken = Mock()
+        encoding = Mock()
+        mock_tiktoken.encoding_for_model.side_effect = [OSError("offline"), encoding]
+
+        with (
+            patch.dict("sys.modules", {"tiktoken": mock_tiktoken}),
+            patch.dict(extraction_module._token_encodings, clear=True),
+        ):
+            assert extraction_module._get_token_encoding("gpt-4o-mini") is None
+            assert extraction_module._get_token_encoding("gpt-4o-mini") is encoding
+            assert extraction_module._get_token_encoding("gpt-4o-mini") is encoding
+
+        assert mock_tiktoken.encoding_for_model.call_count == 2
+
     @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
     @patch("agent_memory_server.extraction.get_model_client")
     async def test_extract_discrete_memories_handles_missing_id(
@@ -496,6 +779,217 @@ class TestDiscreteMemoryExtraction:
         updated_memories = call_args[0][0]  # First positional argument
         assert len(updated_memories) == 30
 
+    async def test_new_memory_ids_are_unique_and_ordered(self):
+        """Test that a batch of memory IDs are valid, unique, ascending ULIDs"""
+        ids = extraction_module._new_memory_ids(5)
+
+        assert len(set(ids)) == 5
+        assert ids == sorted(ids)
+        for memory_id in ids:
+            ulid.ULID.from_str(memory_id)
+        assert extraction_module._new_memory_ids(0) == []
+
+    async def test_find_unextracted_messages_fetches_growing_page_windows(self):
+        """Test that later pages are requested concurrently in growing windows"""
+        many_memories = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text=f"Message {i}",
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for i in range(60)
+        ]
+
+        async def search_memories(**kwargs):
+            result = Mock()
+            offset = kwargs["offset"]
+            result.memories = many_memories[offset : offset + kwargs["limit"]]
+            return result
+
+        mock_adapter = AsyncMock()
+        mock_adapter.search_memories.side_effect = search_memories
+
+        memories = await extraction_module._find_unextracted_messages(mock_adapter)
+
+        assert memories == many_memories
+        # Page 0 alone, then a window of 1 page, then a window of 2 pages
+        offsets = [
+            call[1]["offset"] for call in mock_adapter.search_memories.call_args_list
+        ]
+        assert offsets == [0, 25, 50, 75]
+
+    @patch("agent_memory_server.long_term_memory.index_long_term_memories")
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_limits_llm_concurrency(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+        mock_index_memories,
+    ):
+        """Test that LLM calls run concurrently up to settings.llm_concurrency"""
+        memories = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text=f"Message number {i}",
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for i in range(6)
+        ]
+        in_flight = 0
+        peak = 0
+
+        async def create_chat_completion(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return Mock(choices=[Mock(message=Mock(content='{"memories": []}'))])
+
+        mock_client = AsyncMock()
+        mock_client.create_chat_completion = create_chat_completion
+        mock_get_client.return_value = mock_client
+        mock_get_adapter.return_value = AsyncMock()
+
+        with patch.object(settings, "llm_concurrency", 2):
+            await extract_discrete_memories(memories=memories)
+
+        assert peak == 2
+        updated_memories = mock_get_adapter.return_value.update_memories.call_args[0][0]
+        assert [m.id for m in updated_memories] == [m.id for m in memories]
+
+    @patch("agent_memory_server.long_term_memory.index_long_term_memories")
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_indexes_in_batches(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+        mock_index_memories,
+    ):
+        """Test that extracted memories are indexed in bounded batches"""
+        memories = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text=f"Message number {i}",
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for i in range(10)
+        ]
+        extracted = [
+            {"type": "semantic", "text": f"Fact {i}", "topics": [], "entities": []}
+            for i in range(5)
+        ]
+
+        async def create_chat_completion(**kwargs):
+            await asyncio.sleep(0)
+            content = json.dumps({"memories": extracted})
+            return Mock(choices=[Mock(message=Mock(content=content))])
+
+        mock_client = AsyncMock()
+        mock_client.create_chat_completion = create_chat_completion
+        mock_get_client.return_value = mock_client
+        mock_get_adapter.return_value = AsyncMock()
+
+        await extract_discrete_memories(memories=memories, deduplicate=False)
+
+        batches = [call[0][0] for call in mock_index_memories.call_args_list]
+        assert sum(len(batch) for batch in batches) == 50
+        assert all(
+            len(batch) <= extraction_module.INDEX_BATCH_SIZE for batch in batches
+        )
+        for call in mock_index_memories.call_args_list:
+            assert call[1]["deduplicate"] is False
+
+    @patch("agent_memory_server.long_term_memory.index_long_term_memories")
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_marks_indexed_sources_on_failure(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+        mock_index_memories,
+    ):
+        """Test that a failed extraction doesn't leave indexed sources unmarked"""
+        memories = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text=text,
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for text in ["This one works fine", "This one always fails"]
+        ]
+
+        async def create_chat_completion(prompt, **kwargs):
+            if "always fails" in prompt:
+                raise RuntimeError("LLM unavailable")
+            content = json.dumps({"memories": [{"type": "semantic", "text": "A fact"}]})
+            return Mock(choices=[Mock(message=Mock(content=content))])
+
+        mock_client = AsyncMock()
+        mock_client.create_chat_completion = create_chat_completion
+        mock_get_client.return_value = mock_client
+        mock_adapter = AsyncMock()
+        mock_get_adapter.return_value = mock_adapter
+
+        with pytest.raises(tenacity.RetryError):
+            await extract_discrete_memories(memories=memories)
+
+        mock_index_memories.assert_called_once()
+        updated_memories = mock_adapter.update_memories.call_args[0][0]
+        assert [m.id for m in updated_memories] == [memories[0].id]
+        assert updated_memories[0].discrete_memory_extracted == "t"
+
+    @patch("agent_memory_server.extraction.INDEX_BATCH_SIZE", 1)
+    @patch("agent_memory_server.long_term_memory.index_long_term_memories")
+    @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
+    @patch("agent_memory_server.extraction.get_model_client")
+    async def test_extract_discrete_memories_marks_indexed_sources_on_index_failure(
+        self,
+        mock_get_client,
+        mock_get_adapter,
+        mock_index_memories,
+    ):
+        """Test that an indexing failure still marks sources already indexed"""
+        indexed_first, indexed_second, trivial = [
+            MemoryRecord(
+                id=str(ulid.ULID()),
+                text=text,
+                memory_type=MemoryTypeEnum.MESSAGE,
+                discrete_memory_extracted="f",
+            )
+            for text in ["Indexed in the first batch", "Indexed second", "hi"]
+        ]
+
+        async def create_chat_completion(prompt, **kwargs):
+            if "Indexed second" in prompt:
+                # Finish after the first source so its memory is queued later
+                await asyncio.sleep(0.01)
+            content = json.dumps({"memories": [{"type": "semantic", "text": "A fact"}]})
+            return Mock(choices=[Mock(message=Mock(content=content))])
+
+        mock_client = AsyncMock()
+        mock_client.create_chat_completion = create_chat_completion
+        mock_get_client.return_value = mock_client
+        mock_adapter = AsyncMock()
+        mock_get_adapter.return_value = mock_adapter
+        mock_index_memories.side_effect = [None, RuntimeError("Index unavailable")]
+
+        with pytest.raises(RuntimeError, match="Index unavailable"):
+            await extract_discrete_memories(
+                memories=[indexed_first, indexed_second, trivial]
+            )
+
+        assert mock_index_memories.call_count == 2
+        updated_memories = mock_adapter.update_memories.call_args[0][0]
+        assert {m.id for m in updated_memories} == {trivial.id, indexed_first.id}
+        assert all(m.discrete_memory_extracted == "t" for m in updated_memories)
+
     @patch("agent_memory_server.vectorstore_factory.get_vectorstore_adapter")
     @patch("agent_memory_server.extraction.get_model_client")
     async def test_discrete_memory_extracted_filter_integration(
@@ -647,7 +1141,10 @@ class TestTopicExtractionIntegration:
 
 class TestHandleExtractionPathSelection:
     @pytest.mark.asyncio
-    @patch("agent_memory_server.extraction.extract_topics_bertopic")
+    @patch(
+        "agent_memory_server.extraction.extract_topics_bertopic_batched",
+        new_callable=AsyncMock,
+    )
     @patch("agent_memory_server.extraction.extract_topics_llm")
     async def test_handle_extraction_path_selection(
         self, mock_extract_topics_llm, mock_extract_topics_bertopic
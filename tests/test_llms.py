@@ -1,12 +1,32 @@
+import asyncio
+import base64
+import json
 import os
+import subprocess
+import sys
+from dataclasses import FrozenInstanceError
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import numpy as np
 import pytest
+from pydantic import ValidationError
 
+from agent_memory_server.config import get_settings
 from agent_memory_server.llms import (
+    AnthropicClientWrapper,
+    ChatResponse,
+    ModelConfig,
     ModelProvider,
     OpenAIClientWrapper,
+    SemanticChatCache,
+    _dumps_pretty,
+    _get_usage_field,
+    _model_clients,
+    _schema_to_str,
+    _text_choice,
+    close_model_clients,
+    collect_stream,
+    create_chat_completion_batch,
     get_model_client,
     get_model_config,
 )
@@ -26,10 +46,18 @@ class TestOpenAIClientWrapper:
         # Set up the mock to return an AsyncMock
         mock_openai.return_value = AsyncMock()
 
-        OpenAIClientWrapper()
+        client = OpenAIClientWrapper()
+
+        # Verify one client is created and shared by both endpoints
+        mock_openai.assert_called_once()
+        assert client.completion_client is client.embedding_client
+        assert mock_openai.call_args.kwargs["http_client"] is client._http
+        # The shared client keeps the SDK's long read timeout for completions
+        assert client._http.timeout.read == 600
+        assert client._http.follow_redirects
 
-        # Verify the client was created
-        assert mock_openai.called
+        await client.aclose()
+        assert client._http.is_closed
 
     @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
     async def test_create_embedding(self, mock_init):
@@ -65,9 +93,218 @@ class TestOpenAIClientWrapper:
 
         # Verify the client was called with correct parameters
         client.embedding_client.embeddings.create.assert_called_with(
-            model="text-embedding-ada-002", input=query_vec
+            model="text-embedding-3-small", input=query_vec, encoding_format="base64"
+        )
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_decodes_base64(self, mock_init):
+        """Test that base64 embeddings are decoded from their raw float32 bytes"""
+        client = OpenAIClientWrapper()
+        vectors = np.array([[0.1, 0.2, 0.3], [0.4, 0.5, 0.6]], dtype=np.float32)
+        mock_response = MagicMock()
+        mock_response.data = [
+            MagicMock(embedding=base64.b64encode(vector.tobytes()).decode())
+            for vector in vectors
+        ]
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(
+            return_value=mock_response
+        )
+
+        embeddings = await client.create_embedding(["Hello", "World"])
+
+        assert embeddings.dtype == np.float32
+        assert np.array_equal(embeddings, vectors)
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_requests_configured_dimensions(self, mock_init):
+        """Test that embedding_dimensions shortens vectors for models supporting it"""
+        client = OpenAIClientWrapper()
+
+        async def create(model, input, encoding_format, dimensions=None):
+            response = MagicMock()
+            response.data = [
+                MagicMock(embedding=[0.0] * (dimensions or 3)) for _ in input
+            ]
+            return response
+
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(side_effect=create)
+
+        with patch.object(get_settings(), "embedding_dimensions", 2):
+            small = await client.create_embedding(["a"])
+            ada = await client.create_embedding(["a"], model="text-embedding-ada-002")
+
+        assert small.shape == (1, 2)
+        assert ada.shape == (1, 3)
+        calls = client.embedding_client.embeddings.create.call_args_list
+        assert calls[0].kwargs == {
+            "model": "text-embedding-3-small",
+            "input": ["a"],
+            "encoding_format": "base64",
+            "dimensions": 2,
+        }
+        assert calls[1].kwargs == {
+            "model": "text-embedding-ada-002",
+            "input": ["a"],
+            "encoding_format": "base64",
+        }
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_batches_concurrent_callers(self, mock_init):
+        """Test that concurrent embedding requests share one API call"""
+        client = OpenAIClientWrapper()
+
+        async def create(model, input, encoding_format):
+            response = MagicMock()
+            response.data = [
+                MagicMock(embedding=[float(len(text)), 0.0]) for text in input
+            ]
+            return response
+
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(side_effect=create)
+
+        first, second = await asyncio.gather(
+            client.create_embedding(["a", "bb"]),
+            client.create_embedding(["ccc"]),
+        )
+
+        client.embedding_client.embeddings.create.assert_called_once_with(
+            model="text-embedding-3-small",
+            input=["a", "bb", "ccc"],
+            encoding_format="base64",
+        )
+        assert np.array_equal(first, np.array([[1.0, 0.0], [2.0, 0.0]]))
+        assert np.array_equal(second, np.array([[3.0, 0.0]]))
+        # Each caller owns its array instead of a view of the whole batch
+        assert first.base is None
+        assert second.base is None
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_rejected_input_only_fails_its_caller(
+        self, mock_init
+    ):
+        """Test that a batch rejected for one caller's text is retried per caller"""
+        client = OpenAIClientWrapper()
+
+        class BadRequestError(Exception):
+            status_code = 400
+
+        async def create(model, input, encoding_format):
+            if "too long" in input:
+                raise BadRequestError("input too long")
+            response = MagicMock()
+            response.data = [MagicMock(embedding=[float(len(text))]) for text in input]
+            return response
+
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(side_effect=create)
+
+        good, bad = await asyncio.gather(
+            client.create_embedding(["ok"]),
+            client.create_embedding(["too long"]),
+            return_exceptions=True,
+        )
+
+        assert np.array_equal(good, np.array([[2.0]]))
+        assert isinstance(bad, BadRequestError)
+        assert client.embedding_client.embeddings.create.call_count == 3
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    @patch("agent_memory_server.llms.EMBEDDING_MAX_INPUTS", 2)
+    async def test_create_embedding_splits_large_requests(self, mock_init):
+        """Test that requests over the input limit are split and sent concurrently"""
+        client = OpenAIClientWrapper()
+        in_flight = 0
+        peak = 0
+
+        async def create(model, input, encoding_format):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            response = MagicMock()
+            response.data = [MagicMock(embedding=[float(text)]) for text in input]
+            return response
+
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(side_effect=create)
+
+        embeddings = await client.create_embedding(["1", "2", "3", "4", "5"])
+
+        assert client.embedding_client.embeddings.create.call_count == 3
+        assert peak == 3
+        assert np.array_equal(embeddings, np.array([[1.0], [2.0], [3.0], [4.0], [5.0]]))
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    @patch("agent_memory_server.llms.EMBEDDING_MAX_INPUTS", 10)
+    @patch("agent_memory_server.llms.EMBEDDING_MAX_BATCH_TOKENS", 100)
+    async def test_create_embedding_caps_tokens_per_call(self, mock_init):
+        """Test that requests are split by estimated tokens, not just inputs"""
+        client = OpenAIClientWrapper()
+
+        async def create(model, input, encoding_format):
+            response = MagicMock()
+            response.data = [MagicMock(embedding=[float(len(text))]) for text in input]
+            return response
+
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(side_effect=create)
+
+        # About 31 estimated tokens each, so three fit under 100
+        texts = ["x" * 90] * 5
+        embeddings = await client.create_embedding(texts)
+
+        call_sizes = sorted(
+            len(call.kwargs["input"])
+            for call in client.embedding_client.embeddings.create.call_args_list
+        )
+        assert call_sizes == [2, 3]
+        assert embeddings.shape == (5, 1)
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_empty_input(self, mock_init):
+        """Test that no texts give an empty 2D array without calling the API"""
+        client = OpenAIClientWrapper()
+        client.embedding_client = AsyncMock()
+
+        embeddings = await client.create_embedding([])
+
+        assert embeddings.shape == (0, 1536)
+        assert embeddings.dtype == np.float32
+        client.embedding_client.embeddings.create.assert_not_called()
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_create_embedding_dtypes(self, mock_init):
+        """Test returning half precision and int8-quantized embeddings"""
+        client = OpenAIClientWrapper()
+        mock_response = MagicMock()
+        mock_response.data = [
+            MagicMock(embedding=[0.5, -0.25, 0.125]),
+            MagicMock(embedding=[0.0, 0.0, 0.0]),
+        ]
+        client.embedding_client = AsyncMock()
+        client.embedding_client.embeddings.create = AsyncMock(
+            return_value=mock_response
+        )
+
+        half = await client.create_embedding(["a", "b"], dtype="float16")
+        vectors, scales = await client.create_embedding(["a", "b"], dtype="int8")
+
+        assert half.dtype == np.float16
+        assert np.array_equal(half[0], np.array([0.5, -0.25, 0.125]))
+        assert vectors.dtype == np.int8
+        assert scales.shape == (2, 1)
+        assert np.array_equal(vectors[0], np.array([127, -64, 32]))
+        assert np.allclose(
+            vectors * scales, [item.embedding for item in mock_response.data], atol=0.01
         )
 
+        with pytest.raises(ValueError, match="Unsupported embedding dtype"):
+            await client.create_embedding(["a"], dtype="float64")
+
     @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
     async def test_create_chat_completion(self, mock_init):
         """Test creating chat completions"""
@@ -100,6 +337,371 @@ class TestOpenAIClientWrapper:
         )
 
 
+@pytest.mark.asyncio
+class TestChatCompletionsBatch:
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_batch_limits_concurrency_and_keeps_order(self, mock_init):
+        """Test that batch completions respect the concurrency limit and order"""
+        client = OpenAIClientWrapper()
+        in_flight = 0
+        peak = 0
+
+        async def create(model, prompt, response_format, functions, function_call):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            # Finish later prompts first
+            await asyncio.sleep(0.01 / len(prompt))
+            in_flight -= 1
+            return ChatResponse(
+                choices=[{"message": {"content": prompt.upper()}}], usage={}
+            )
+
+        client.create_chat_completion = AsyncMock(side_effect=create)
+        prompts = ["a", "bb", "ccc", "dddd", "eeeee"]
+
+        responses = await client.create_chat_completions_batch(
+            "gpt-4o-mini", prompts, concurrency=2
+        )
+
+        assert [r.choices[0]["message"]["content"] for r in responses] == [
+            "A",
+            "BB",
+            "CCC",
+            "DDDD",
+            "EEEEE",
+        ]
+        assert peak == 2
+
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_batch_dispatches_longest_first(self, mock_init):
+        """Test that prompts predicted to run longest are sent first"""
+        client = OpenAIClientWrapper()
+        started = []
+        in_flight = 0
+        peak = 0
+
+        async def create(model, prompt, response_format, functions, function_call):
+            nonlocal in_flight, peak
+            started.append(prompt)
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return ChatResponse(choices=[prompt], usage={})
+
+        client.create_chat_completion = AsyncMock(side_effect=create)
+        prompts = ["one two three four", "hi", "one two three", "hey you there"]
+
+        responses = await client.create_chat_completions_batch(
+            "gpt-4o-mini", prompts, concurrency=2
+        )
+
+        # Results keep prompt order
+        assert [r.choices[0] for r in responses] == prompts
+        # Longest predicted first, ties in prompt order
+        assert started == ["one two three four", "one two three", "hey you there", "hi"]
+        assert peak == 2
+
+    async def test_create_chat_completion_batch_uses_provider_client(self):
+        """Test that the module-level helper dispatches on the model's provider"""
+        client = MagicMock()
+        client.create_chat_completions_batch = AsyncMock(return_value=["response"])
+
+        with patch(
+            "agent_memory_server.llms.get_model_client",
+            AsyncMock(return_value=client),
+        ) as mock_get_client:
+            responses = await create_chat_completion_batch(
+                "claude-3-5-haiku-latest", ["Hello"]
+            )
+
+        assert responses == ["response"]
+        mock_get_client.assert_awaited_once_with(ModelProvider.ANTHROPIC)
+        client.create_chat_completions_batch.assert_awaited_once_with(
+            "claude-3-5-haiku-latest",
+            ["Hello"],
+            response_format=None,
+            functions=None,
+            function_call=None,
+            concurrency=None,
+        )
+
+
+class TestAnthropicClientWrapper:
+    @patch.dict(os.environ, {"ANTHROPIC_API_KEY": "test-key"})
+    @patch("agent_memory_server.llms.anthropic")
+    def test_init_creates_one_client(self, mock_anthropic):
+        """Test that initialization constructs a single Anthropic client"""
+        client = AnthropicClientWrapper()
+
+        mock_anthropic.AsyncAnthropic.assert_called_once_with(api_key="test-key")
+        assert client.client is mock_anthropic.AsyncAnthropic.return_value
+
+    @patch.dict(os.environ, {}, clear=True)
+    @patch("agent_memory_server.llms.anthropic")
+    def test_init_requires_api_key(self, mock_anthropic):
+        """Test that a missing API key is rejected before creating a client"""
+        with pytest.raises(ValueError, match="Anthropic API key is required"):
+            AnthropicClientWrapper()
+
+        mock_anthropic.AsyncAnthropic.assert_not_called()
+
+    @pytest.mark.asyncio
+    @patch.object(AnthropicClientWrapper, "__init__", return_value=None)
+    async def test_create_chat_completion_uses_openai_choice_shape(self, mock_init):
+        """Test that Anthropic responses expose choices like OpenAI's"""
+        client = AnthropicClientWrapper()
+        client.client = MagicMock()
+        client.client.messages.create = AsyncMock(
+            return_value=MagicMock(
+                content=[MagicMock(text="Hi there")],
+                usage={"input_tokens": 3, "output_tokens": 2},
+            )
+        )
+
+        response = await client.create_chat_completion("claude-3-5-haiku-latest", "Hi")
+
+        assert response.choices[0].message.content == "Hi there"
+        assert response.total_tokens == 5
+
+
+@pytest.mark.asyncio
+class TestStreamChatCompletion:
+    @patch.object(OpenAIClientWrapper, "__init__", return_value=None)
+    async def test_openai_stream_yields_text(self, mock_init):
+        """Test streaming text deltas from OpenAI"""
+        client = OpenAIClientWrapper()
+
+        class Stream:
+            closed = False
+
+            async def __aenter__(self):
+                return self
+
+            async def __aexit__(self, *exc_info):
+                self.closed = True
+
+            async def __aiter__(self):
+                for content in ["Hel", None, "lo"]:
+                    yield MagicMock(
+                        choices=[MagicMock(delta=MagicMock(content=content))]
+                    )
+                # The final usage chunk has no choices
+                yield MagicMock(choices=[])
+
+        stream = Stream()
+        client.completion_client = AsyncMock()
+        client.completion_client.chat.completions.create = AsyncMock(
+            return_value=stream
+        )
+
+        response = await collect_stream(
+            client.stream_chat_completion("gpt-4o-mini", "Hi")
+        )
+
+        assert response.choices[0].message.content == "Hello"
+        assert stream.closed
+        client.completion_client.chat.completions.create.assert_called_once_with(
+            model="gpt-4o-mini",
+            messages=[{"role": "user", "content": "Hi"}],
+            stream=True,
+        )
+
+    @patch.object(AnthropicClientWrapper, "__init__", return_value=None)
+    async def test_anthropic_stream_yields_text(self, mock_init):
+        """Test streaming text from Anthropic"""
+        client = AnthropicClientWrapper()
+
+        async def text_stream():
+            for text in ["Hel", "lo"]:
+                yield text
+
+        stream = MagicMock(text_stream=text_stream())
+        client.client = MagicMock()
+        client.client.messages.stream.return_value.__aenter__ = AsyncMock(
+            return_value=stream
+        )
+        client.client.messages.stream.return_value.__aexit__ = AsyncMock(
+            return_value=None
+        )
+
+        texts = [
+            text
+            async for text in client.stream_chat_completion(
+                "claude-3-5-haiku-latest", "Hi"
+            )
+        ]
+
+        assert texts == ["Hel", "lo"]
+        client.client.messages.stream.assert_called_once_with(
+            model="claude-3-5-haiku-latest",
+            messages=[{"role": "user", "content": "Hi"}],
+            max_tokens=1024,
+        )
+
+
+@pytest.mark.asyncio
+class TestSemanticChatCache:
+    def make_cache(self, distance=None):
+        redis = AsyncMock()
+        redis.get = AsyncMock(return_value=None)
+        embed = AsyncMock(return_value=np.ones((1, 4), dtype=np.float32))
+        cache = SemanticChatCache(redis=redis, embed=embed, dimensions=4)
+        cache._index = AsyncMock()
+        cache._index.query = AsyncMock(
+            return_value=[]
+            if distance is None
+            else [
+                {
+                    "vector_distance": str(distance),
+                    "response": '{"contents":["Cached"],"usage":{"total_tokens":7}}',
+                }
+            ]
+        )
+        return cache
+
+    async def test_exact_match_skips_embedding_and_model(self):
+        """Test that an identical request is served from the exact-match key"""
+        cache = self.make_cache()
+        cache.redis.get = AsyncMock(
+            return_value=b'{"contents":["Cached"],"usage":{"total_tokens":7}}'
+        )
+        create = AsyncMock()
+
+        response = await cache.get_or_create(create, "gpt-4o-mini", "Hello")
+
+        assert response.choices[0].message.content == "Cached"
+        # A cached response spends no tokens
+        assert response.total_tokens == 0
+        create.assert_not_called()
+        cache.embed.assert_not_called()
+
+    async def test_similar_prompt_reuses_response(self):
+        """Test that a nearby prompt within the threshold reuses its response"""
+        cache = self.make_cache(distance=0.01)
+        create = AsyncMock()
+
+        response = await cache.get_or_create(
+            create, "gpt-4o-mini", "Template: Hello!", semantic_key="Hello!"
+        )
+
+        assert response.choices[0].message.content == "Cached"
+        create.assert_not_called()
+        cache.embed.assert_awaited_once_with(["Hello!"])
+
+    async def test_without_semantic_key_only_exact_match(self):
+        """Test that requests without a semantic key skip the vector index"""
+        cache = self.make_cache(distance=0.01)
+        create = AsyncMock(
+            return_value=ChatResponse(
+                choices=[_text_choice("Fresh")], usage={"total_tokens": 3}
+            )
+        )
+
+        response = await cache.get_or_create(create, "gpt-4o-mini", "Hello!")
+
+        assert response.choices[0].message.content == "Fresh"
+        cache.embed.assert_not_called()
+        cache._index.query.assert_not_called()
+        cache._index.load.assert_not_called()
+        cache.redis.set.assert_awaited_once()
+
+    async def test_miss_creates_and_stores_response(self):
+        """Test that a miss calls the model and stores the response"""
+        cache = self.make_cache(distance=0.5)
+        create = AsyncMock(
+            return_value=ChatResponse(
+                choices=[{"message": {"content": "Fresh"}}],
+                usage={"total_tokens": 3},
+            )
+        )
+
+        response = await cache.get_or_create(
+            create,
+            "gpt-4o-mini",
+            "Hello",
+            {"type": "json_object"},
+            semantic_key="Hello",
+        )
+
+        assert response.choices[0]["message"]["content"] == "Fresh"
+        create.assert_awaited_once_with(
+            "gpt-4o-mini", "Hello", {"type": "json_object"}, None, None
+        )
+        cache.redis.set.assert_awaited_once()
+        cache._index.load.assert_awaited_once()
+        entry = cache._index.load.call_args.args[0][0]
+        assert entry["model"] == "gpt-4o-mini"
+        assert entry["response"] == b'{"contents":["Fresh"]}'
+
+    async def test_semantic_matches_are_scoped_to_the_prompt_template(self):
+        """Test that entries are tagged by the prompt around the semantic key"""
+        cache = self.make_cache()
+        create = AsyncMock(
+            return_value=ChatResponse(choices=[_text_choice("Fresh")], usage={})
+        )
+
+        for prompt, key in [
+            ("Topics of: Hello", "Hello"),
+            ("Topics of: Goodbye", "Goodbye"),
+            ("Summarize: Hello", "Hello"),
+        ]:
+            await cache.get_or_create(create, "gpt-4o-mini", prompt, semantic_key=key)
+
+        templates = [
+            call.args[0][0]["template"] for call in cache._index.load.call_args_list
+        ]
+        assert templates[0] == templates[1]
+        assert templates[0] != templates[2]
+
+
+def test_chat_response_defaults():
+    """Test that empty choices and usage are normalized"""
+    response = ChatResponse(choices=None, usage=None)
+
+    assert response.choices == []
+    assert response.total_tokens == 0
+    assert not hasattr(response, "__dict__")
+
+
+@pytest.mark.parametrize(
+    ("usage", "expected"),
+    [
+        ({"total_tokens": 12}, 12),
+        (MagicMock(total_tokens=7), 7),
+        ({"input_tokens": 3}, 0),
+        (MagicMock(total_tokens=None), 0),
+        (None, 0),
+    ],
+)
+def test_get_usage_field(usage, expected):
+    """Test reading token counts from dict and object usage formats"""
+    assert _get_usage_field(usage, "total_tokens") == expected
+
+
+def test_schema_to_str_reuses_formatted_schema():
+    """Test that a schema dict is formatted once and equal dicts are not confused"""
+    schema = {"type": "object", "properties": {"topics": {"type": "array"}}}
+
+    with patch("agent_memory_server.llms._dumps_pretty", wraps=_dumps_pretty) as dumps:
+        first = _schema_to_str(schema)
+        second = _schema_to_str(schema)
+        other = _schema_to_str({"type": "string"})
+
+    assert first is second
+    assert first == json.dumps(schema, indent=2)
+    assert other == json.dumps({"type": "string"}, indent=2)
+    assert dumps.call_count == 2
+
+
+def test_dumps_pretty_matches_json_dumps():
+    """Test that non-ASCII text and floats are formatted as json.dumps does"""
+    value = {"name": "café 😀", "threshold": 1e-05}
+
+    assert _dumps_pretty(value) == json.dumps(value, indent=2)
+
+
 @pytest.mark.parametrize(
     ("model_name", "expected_provider", "expected_max_tokens"),
     [
@@ -123,6 +725,36 @@ def test_get_model_config(model_name, expected_provider, expected_max_tokens):
     assert config.max_tokens == expected_max_tokens
 
 
+def test_get_model_config_warns_once_per_unknown_model(caplog):
+    """Test that lookups are cached so an unknown model is only logged once"""
+    get_model_config.cache_clear()
+
+    with caplog.at_level("WARNING", logger="agent_memory_server.llms"):
+        first = get_model_config("unknown-model")
+        second = get_model_config("unknown-model")
+
+    assert first is second is get_model_config("gpt-4o-mini")
+    assert len(caplog.records) == 1
+
+
+def test_model_config_validate():
+    """Test validating user-supplied model configuration"""
+    config = ModelConfig.validate(
+        {"provider": "anthropic", "name": "custom-model", "max_tokens": 1000}
+    )
+
+    assert config == ModelConfig(
+        provider=ModelProvider.ANTHROPIC, name="custom-model", max_tokens=1000
+    )
+
+    with pytest.raises(ValidationError):
+        ModelConfig.validate({"provider": "unknown", "name": "x", "max_tokens": 1})
+
+    # Configs are immutable
+    with pytest.raises(FrozenInstanceError):
+        config.max_tokens = 2000
+
+
 @pytest.mark.asyncio
 async def test_get_model_client():
     """Test the get_model_client function and caching by provider"""
@@ -149,3 +781,49 @@ async def test_get_model_client():
         assert client1 == "anthropic-client"
         assert client1 is client2
         mock_anthropic.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_get_model_client_concurrent_cold_calls_share_client():
+    """Test that concurrent callers on a cold cache get one shared client"""
+    with (
+        patch.dict("agent_memory_server.llms._model_clients", clear=True),
+        patch.dict(
+            "agent_memory_server.llms.PROVIDER_FACTORY",
+            {ModelProvider.OPENAI: MagicMock(side_effect=lambda: object())},
+        ) as factories,
+    ):
+        clients = await asyncio.gather(*(get_model_client("openai") for _ in range(5)))
+
+        assert all(client is clients[0] for client in clients)
+        factories[ModelProvider.OPENAI].assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_close_model_clients_closes_and_forgets_cached_clients():
+    """Test that shutdown closes every cached client, even after a failure"""
+    failing = MagicMock(aclose=AsyncMock(side_effect=RuntimeError("boom")))
+    working = MagicMock(aclose=AsyncMock())
+    with patch.dict(
+        "agent_memory_server.llms._model_clients",
+        {ModelProvider.OPENAI: failing, ModelProvider.ANTHROPIC: working},
+        clear=True,
+    ):
+        await close_model_clients()
+
+        failing.aclose.assert_awaited_once()
+        working.aclose.assert_awaited_once()
+        assert not _model_clients
+
+
+def test_import_defers_provider_sdks():
+    """Test that importing the module doesn't import the provider SDKs"""
+    code = (
+        "import sys, agent_memory_server.llms; "
+        "print(sorted(m for m in ('openai', 'anthropic', 'numpy') if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    )
+
+    assert result.stdout.strip() == "[]"